@@ -1,22 +1,39 @@
 # === Python Modules ===
 import os
-import json
+import time
+import uuid
+import asyncio
 import boto3
 from typing import Dict, Any, List
 from pathlib import Path
 from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# === Utils ===
+from Task1.utils import _json
+from Task1.utils.common import (
+    get_async_conn,
+    open_file,
+    read_keys,
+    split_s3_uri
+)
+from Task1.utils.store import EntityStore
+from Task1.utils.rate_limit import RateLimiter
 
 # === Function to check which extracted texts are not yet processed by Medical Comprehend ===
 def check_existing_comprehend(
         textract_file_path: Path = Path("data/processed_images/processed_text.json"),
-        comprehend_file_path: Path = Path("data/processed_medical/processed_entities.json")
+        comprehend_file_path: Path = Path("data/processed_medical/processed_entities.json"),
+        store: EntityStore | None = None
 ) -> Dict[str, List[str]]:
     """
     Compares the keys (file names) between Textract and Comprehend Medical outputs to identify which files still need to be analyzed.
+    Names discarded from the store (images whose text was re-extracted) count as not analyzed, so they are analyzed again.
 
     Args:
         - textract_file_path (Path): Path to the JSON file containing Textract extracted text.
         - comprehend_file_path (Path): Path to the JSON file containing Comprehend Medical extracted entities.
+        - store (EntityStore | None, optional): Entity store to read the analyzed keys from. If None, one is opened on `comprehend_file_path`.
 
     Returns:
         - Dict[str, List[str]]: {
@@ -24,58 +41,48 @@ def check_existing_comprehend(
                 "already_analyzed": [...]
             }
     """
-    try:
-        ## === Load Textract processed data ===
-        if textract_file_path.exists():
-            with open(
-                textract_file_path,
-                "r",
-                encoding = "utf-8"
-            ) as f:
-                textract_data = json.load(f)
-            textract_keys = set(textract_data.keys())
-        else:
-            print("No Textract processed file found.")
-            return {"to_analyze": [], "already_analyzed": []}
-
-        ## === Load Comprehend processed data (if exists) ===
-        if comprehend_file_path.exists():
-            with open(
-                comprehend_file_path,
-                "r",
-                encoding = "utf-8"
-            ) as f:
-                comprehend_data = json.load(f)
-            comprehend_keys = set(comprehend_data.keys())
-        else:
-            comprehend_data = {}
-            comprehend_keys = set()
-
-        ## === Compare keys ===
-        to_analyze = [key for key in textract_keys if key not in comprehend_keys]
-        already_analyzed = [key for key in textract_keys if key in comprehend_keys]
-
-        ## === Optional: Prepare a dict of texts to pass to Comprehend ===
-        texts_to_analyze: Dict[str, str] = {
-            key: textract_data[key] for key in to_analyze
-        }
+    ## === Load Textract processed keys ===
+    textract_keys = read_keys(textract_file_path)
+    if not textract_keys:
+        print("No Textract processed file found.")
+        return {"to_analyze": [], "already_analyzed": []}
 
-        ## === Return both lists and ready-to-process text dict ===
-        return {
-            "to_analyze": to_analyze,
-            "already_analyzed": already_analyzed,
-            "texts_to_analyze": texts_to_analyze
-        }
+    ## === Load Comprehend processed keys from the store index (a store opened here is closed here, which saves a rebuilt index) ===
+    if store is None:
+        with EntityStore(comprehend_file_path) as store:
+            comprehend_keys = set(store.keys())
+    else:
+        comprehend_keys = set(store.keys())
+
+    ## === Compare keys with set operations ===
+    to_analyze_set = textract_keys - comprehend_keys
+    to_analyze = sorted(to_analyze_set)
+    already_analyzed = sorted(textract_keys & comprehend_keys)
+
+    ## === Load the extracted texts only if something needs analyzing ===
+    textract_data = open_file(textract_file_path) if to_analyze_set else {}
 
-    except Exception as e:
-        raise e
+    ## === Optional: Prepare a dict of texts to pass to Comprehend ===
+    texts_to_analyze: Dict[str, str] = {
+        key: textract_data[key] for key in to_analyze
+    }
+
+    ## === Return both lists and ready-to-process text dict ===
+    return {
+        "to_analyze": to_analyze,
+        "already_analyzed": already_analyzed,
+        "texts_to_analyze": texts_to_analyze
+    }
 
 # === Extract meaningful data using AWS Medical Comprehend ===
 def extract_medical_entities(
         client: boto3.client,
         text_data: Dict[str, str],
         to_process: List[str] | None = None,
-        save_data: bool = False
+        save_data: bool = False,
+        max_workers: int = 16,
+        store: EntityStore | None = None,
+        rate_limiter: RateLimiter | None = None
 ) -> Dict[str, Any]:
     """
     Uses AWS Comprehend Medical to extract entities such as conditions, medications, 
@@ -85,85 +92,298 @@ def extract_medical_entities(
         - client (boto3.client): An initialized boto3 client for AWS Comprehend Medical.
         - text_data (Dict[str, str]): Dictionary where keys are file names and values are extracted text strings.
         - to_process (List[str] | None, optional): List of file names to analyze. If None, all files are processed.
-        - save_data (bool, optional): Whether to save or update the output JSON file. Defaults to False.
+        - save_data (bool, optional): Whether to append the results to the entity store. Defaults to False.
+        - max_workers (int, optional): Maximum number of Comprehend Medical calls in flight at once. Defaults to 16.
+        - store (EntityStore | None, optional): Store to append the results to. If None, the default store is opened and closed here.
+        - rate_limiter (RateLimiter | None, optional): Token bucket acquired before every Comprehend Medical request. If None, calls are not rate limited.
 
     Returns:
         - entity_dict (Dict[str, Any]): Dictionary where keys are file names and values are Comprehend Medical API responses.
     """
-    try:
-        ## === If no text data available ===
-        if not text_data:
-            print("No text data available for processing.")
-            return {}
-
-        ## === If no specific files provided, process all ===
-        if not to_process:
-            print("No 'to_process' list provided — analyzing all files.")
-            to_process = list(text_data.keys())
-
-        ## === Filter text data for only the given files ===
-        subset_data = {
-            key: text_data[key]
-            for key in to_process
-            if key in text_data
+    ## === If no text data available ===
+    if not text_data:
+        print("No text data available for processing.")
+        return {}
+
+    ## === If no specific files provided, process all ===
+    if not to_process:
+        print("No 'to_process' list provided — analyzing all files.")
+        to_process = list(text_data.keys())
+
+    ## === Filter text data for only the given files ===
+    subset_data = {
+        key: text_data[key]
+        for key in to_process
+        if key in text_data
+    }
+
+    ## === Initiate an empty dictionary for new results ===
+    entity_dict: Dict[str, Any] = {}
+
+    ## === Append-only entity store (opened here unless the caller passes one) ===
+    close_store: bool = False
+    if save_data and store is None:
+        os.makedirs(
+            Path("data/processed_medical"),
+            exist_ok = True
+        )
+        store = EntityStore()
+        close_store = True
+
+    ## === One request, spaced out by the rate limiter if given ===
+    def _detect(txt: str) -> Dict[str, Any]:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        return client.detect_entities_v2(Text = txt)
+
+    ## === Run Comprehend Medical concurrently over the subset ===
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        futures = {
+            executor.submit(
+                _detect,
+                txt
+            ): file_name
+            for file_name, txt in subset_data.items()
         }
 
-        ## === Initiate an empty dictionary for new results ===
-        entity_dict: Dict[str, Any] = {}
+        for future in as_completed(futures):
+            file_name = futures[future]
 
-        ## === Loop through the subset and run Comprehend Medical ===
-        for file_name, txt in subset_data.items():
             try:
-                response = client.detect_entities_v2(Text=txt)
-                entity_dict[file_name] = response
+                entity_dict[file_name] = future.result()
                 print(f"Processed: {file_name}")
             except Exception as e:
                 print(f"Error processing {file_name}: {e}")
                 continue
 
-        ## === Save or update the JSON file ===
+            ## === Append only the new record instead of rewriting the whole file ===
+            if save_data:
+                store.put(
+                    name = file_name,
+                    response = entity_dict[file_name]
+                )
+
+    if save_data:
+        if close_store:
+            store.close()
+        print(f"File updated: {store.data_path}")
+
+    return entity_dict
+
+# === Async variant of `extract_medical_entities` on a single event loop ===
+async def extract_medical_entities_async(
+        text_data: Dict[str, str],
+        to_process: List[str] | None = None,
+        save_data: bool = False,
+        max_concurrency: int = 32,
+        store: EntityStore | None = None,
+        rate_limiter: RateLimiter | None = None
+) -> Dict[str, Any]:
+    """
+    Same as `extract_medical_entities`, but with an aioboto3 Comprehend Medical client keeping up to
+    `max_concurrency` requests in flight on one event loop.
+
+    Args:
+        - text_data (Dict[str, str]): Dictionary where keys are file names and values are extracted text strings.
+        - to_process (List[str] | None, optional): List of file names to analyze. If None, all files are processed.
+        - save_data (bool, optional): Whether to append the results to the entity store. Defaults to False.
+        - max_concurrency (int, optional): Maximum number of Comprehend Medical calls in flight at once. Defaults to 32.
+        - store (EntityStore | None, optional): Store to append the results to. If None, the default store is opened and closed here.
+        - rate_limiter (RateLimiter | None, optional): Token bucket awaited before every Comprehend Medical request. If None, calls are not rate limited.
+
+    Returns:
+        - entity_dict (Dict[str, Any]): Dictionary where keys are file names and values are Comprehend Medical API responses.
+    """
+    ## === If no text data available ===
+    if not text_data:
+        print("No text data available for processing.")
+        return {}
+
+    ## === If no specific files provided, process all ===
+    if not to_process:
+        print("No 'to_process' list provided — analyzing all files.")
+        to_process = list(text_data.keys())
+
+    subset_data = {
+        key: text_data[key]
+        for key in to_process
+        if key in text_data
+    }
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with get_async_conn(service = "comprehendmedical") as client:
+        async def _detect(txt: str):
+            async with semaphore:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire_async()
+                return await client.detect_entities_v2(Text = txt)
+
+        responses = await asyncio.gather(
+            *(_detect(txt) for txt in subset_data.values()),
+            return_exceptions = True
+        )
+
+    ## === Append-only entity store (opened here unless the caller passes one) ===
+    close_store: bool = False
+    if save_data and store is None:
+        os.makedirs(
+            Path("data/processed_medical"),
+            exist_ok = True
+        )
+        store = EntityStore()
+        close_store = True
+
+    entity_dict: Dict[str, Any] = {}
+    for file_name, response in zip(subset_data, responses):
+        if isinstance(response, Exception):
+            print(f"Error processing {file_name}: {response}")
+            continue
+
+        entity_dict[file_name] = response
+        print(f"Processed: {file_name}")
+
         if save_data:
-            data_path: Path = Path("data/processed_medical")
-            os.makedirs(
-                data_path,
-                exist_ok = True
+            store.put(
+                name = file_name,
+                response = response
             )
 
-            save_path: Path = data_path / "processed_entities.json"
-
-            ## === Load existing data if exists ===
-            if save_path.exists():
-                with open(
-                    save_path,
-                    "r",
-                    encoding = "utf-8"
-                ) as f:
-                    existing_data = json.load(f)
-            else:
-                existing_data = {}
-
-            ## === Merge new data with existing ===
-            updated_data = {**existing_data, **entity_dict}
-
-            ## === Save the merged data ===
-            with open(
-                save_path,
-                "w",
-                encoding = "utf-8"
-            ) as f:
-                """
-                Saves or updates the Comprehend Medical extracted entities in JSON format.
-                """
-                json.dump(
-                    updated_data,
-                    f,
-                    ensure_ascii = False,
-                    indent = 4
-                )
+    if save_data:
+        if close_store:
+            store.close()
+        print(f"File updated: {store.data_path}")
+
+    return entity_dict
+
+# === Extract entities for many files at once with an asynchronous Comprehend Medical job ===
+def extract_medical_entities_batch(
+        client: boto3.client,
+        s3_client: boto3.client,
+        text_data: Dict[str, str],
+        s3_input_uri: str,
+        s3_output_uri: str,
+        role_arn: str,
+        to_process: List[str] | None = None,
+        save_data: bool = False,
+        store: EntityStore | None = None,
+        poll_interval: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Uses an asynchronous AWS Comprehend Medical job (`start_entities_detection_v2_job`) to extract entities
+    from many files in one S3 to S3 batch, instead of one synchronous `detect_entities_v2` call per file.
+
+    Args:
+        - client (boto3.client): An initialized boto3 client for AWS Comprehend Medical.
+        - s3_client (boto3.client): An initialized boto3 client for S3.
+        - text_data (Dict[str, str]): Dictionary where keys are file names and values are extracted text strings.
+        - s3_input_uri (str): `s3://bucket/prefix` the texts are uploaded under (one sub-prefix per run).
+        - s3_output_uri (str): `s3://bucket/prefix` the job writes its results under (one sub-prefix per run).
+        - role_arn (str): IAM role Comprehend Medical assumes to read the input and write the output.
+        - to_process (List[str] | None, optional): List of file names to analyze. If None, all files are processed.
+        - save_data (bool, optional): Whether to append the results to the entity store. Defaults to False.
+        - store (EntityStore | None, optional): Store to append the results to. If None, the default store is opened and closed here.
+        - poll_interval (float, optional): Seconds between job status checks. Defaults to 30.
+
+    Returns:
+        - entity_dict (Dict[str, Any]): Dictionary where keys are file names and values are Comprehend Medical results.
+    """
+    ## === If no text data available ===
+    if not text_data:
+        print("No text data available for processing.")
+        return {}
 
-            print(f"File updated: {save_path}")
+    ## === If no specific files provided, process all ===
+    if not to_process:
+        print("No 'to_process' list provided — analyzing all files.")
+        to_process = list(text_data.keys())
+
+    ## === Filter text data for only the given files ===
+    subset_data = {
+        key: text_data[key]
+        for key in to_process
+        if key in text_data
+    }
+
+    ## === Upload the texts under a fresh prefix so the job only sees this run ===
+    run_id: str = uuid.uuid4().hex
+    input_bucket, input_prefix = split_s3_uri(s3_input_uri)
+    output_bucket, output_prefix = split_s3_uri(s3_output_uri)
+    input_key: str = f"{input_prefix}/{run_id}".lstrip("/")
+    output_key: str = f"{output_prefix}/{run_id}".lstrip("/")
+
+    for file_name, txt in subset_data.items():
+        s3_client.put_object(
+            Bucket = input_bucket,
+            Key = f"{input_key}/{file_name}.txt",
+            Body = txt.encode("utf-8")
+        )
+
+    ## === Start the job ===
+    job_id: str = client.start_entities_detection_v2_job(
+        InputDataConfig = {"S3Bucket": input_bucket, "S3Key": input_key},
+        OutputDataConfig = {"S3Bucket": output_bucket, "S3Key": output_key},
+        DataAccessRoleArn = role_arn,
+        JobName = f"entities-{run_id}",
+        LanguageCode = "en"
+    )["JobId"]
+    print(f"Started Comprehend Medical job {job_id} for {len(subset_data)} files.")
+
+    ## === Poll until the job finishes ===
+    while True:
+        job = client.describe_entities_detection_v2_job(
+            JobId = job_id
+        )["ComprehendMedicalAsyncJobProperties"]
+
+        if job["JobStatus"] in ("COMPLETED", "PARTIAL_SUCCESS"):
+            break
+        if job["JobStatus"] in ("FAILED", "STOP_REQUESTED", "STOPPED"):
+            raise RuntimeError(f"Comprehend Medical job {job_id} ended with status {job['JobStatus']}: {job.get('Message', '')}")
+
+        time.sleep(poll_interval)
+
+    ## === Append-only entity store (opened here unless the caller passes one) ===
+    close_store: bool = False
+    if save_data and store is None:
+        os.makedirs(
+            Path("data/processed_medical"),
+            exist_ok = True
+        )
+        store = EntityStore()
+        close_store = True
+
+    ## === Download the `<file>.txt.out` results written by the job ===
+    entity_dict: Dict[str, Any] = {}
+    result_bucket: str = job["OutputDataConfig"]["S3Bucket"]
+    result_prefix: str = job["OutputDataConfig"].get("S3Key", output_key)
+
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket = result_bucket, Prefix = result_prefix):
+        for obj in page.get("Contents", []):
+            if not obj["Key"].endswith(".txt.out"):
+                continue
+
+            file_name = obj["Key"].rsplit("/", 1)[-1].removesuffix(".txt.out")
+            if file_name not in subset_data:
+                continue
+
+            body = s3_client.get_object(
+                Bucket = result_bucket,
+                Key = obj["Key"]
+            )["Body"].read()
+
+            entity_dict[file_name] = _json.loads(body)
+            print(f"Processed: {file_name}")
+
+            if save_data:
+                store.put(
+                    name = file_name,
+                    response = entity_dict[file_name]
+                )
 
-        return entity_dict
+    if save_data:
+        if close_store:
+            store.close()
+        print(f"File updated: {store.data_path}")
 
-    except Exception as e:
-        raise e
\ No newline at end of file
+    return entity_dict
@@ -1,44 +1,236 @@
 # === Python Modules ===
 import os
+import re
+import time
+import queue
+import asyncio
 import boto3
-import json
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Set
+from concurrent.futures import ThreadPoolExecutor
+
+# === Utils ===
+from Task1.utils.common import (
+    append_jsonl,
+    get_async_conn,
+    maybe_compact_jsonl,
+    read_fingerprints,
+    read_keys,
+    split_s3_uri,
+    update_fingerprints,
+    update_keys
+)
+from Task1.utils.rate_limit import RateLimiter
+
+## === Image / document file extensions picked up from the raw images folder (compiled once, case-insensitive) ===
+IMAGE_PATTERN = re.compile(r"\.(?:png|jpe?g|pdf|tiff?)\Z", re.IGNORECASE)
+
+## === Multi-page formats, sent to the asynchronous Textract API whenever an S3 location is configured ===
+DOCUMENT_PATTERN = re.compile(r"\.(?:pdf|tiff?)\Z", re.IGNORECASE)
+
+## === Files larger than this (1 MB) use the asynchronous Textract API when an S3 location is configured ===
+ASYNC_SIZE_THRESHOLD: int = 1 << 20
+
+# === Function to wait for an asynchronous Textract job and collect all its pages ===
+def _wait_for_text_detection(
+        client: boto3.client,
+        job_id: str,
+        initial_delay: float = 1.0,
+        max_delay: float = 30.0,
+        block_types: frozenset | None = frozenset({"LINE"})
+) -> Dict[str, Any]:
+    """
+    Polls `get_document_text_detection` with exponential backoff until the job finishes,
+    then follows `NextToken` to gather every page of Blocks into a single response.
+    Blocks are filtered page by page as they arrive, so only one page of WORD/PAGE blocks is held at a time.
+
+    Args:
+        - client (boto3.client): An initialized boto3 client for AWS Textract.
+        - job_id (str): JobId returned by `start_document_text_detection`.
+        - initial_delay (float, optional): First wait between polls in seconds. Defaults to 1.
+        - max_delay (float, optional): Upper bound for the wait between polls in seconds. Defaults to 30.
+        - block_types (frozenset | None, optional): BlockTypes to keep. Defaults to LINE, the only type `get_relevant_data` reads; None keeps every block.
+
+    Returns:
+        - response (Dict[str, Any]): Textract response with the (kept) Blocks of all pages.
+    """
+    delay: float = initial_delay
+
+    while True:
+        response = client.get_document_text_detection(
+            JobId = job_id
+        )
+
+        if response["JobStatus"] in ("SUCCEEDED", "PARTIAL_SUCCESS"):
+            break
+        if response["JobStatus"] == "FAILED":
+            raise RuntimeError(f"Textract job {job_id} failed: {response.get('StatusMessage', '')}")
+
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+    ## === Keep only the wanted Blocks of a page ===
+    def _keep(page_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if block_types is None:
+            return page_blocks
+        return [block for block in page_blocks if block.get("BlockType") in block_types]
+
+    ## === Gather the remaining pages of Blocks ===
+    blocks: List[Dict[str, Any]] = _keep(response.get("Blocks", []))
+    next_token = response.pop("NextToken", None)
+
+    while next_token:
+        page = client.get_document_text_detection(
+            JobId = job_id,
+            NextToken = next_token
+        )
+        blocks.extend(_keep(page.get("Blocks", [])))
+        next_token = page.get("NextToken")
+
+    response["Blocks"] = blocks
+    return response
+
+# === Function to extract a (multi-page) document with the asynchronous Textract API ===
+def extract_document_async(
+        client: boto3.client,
+        s3_client: boto3.client,
+        file_path: Path,
+        s3_uri: str,
+        rate_limiter: RateLimiter | None = None
+) -> Dict[str, Any]:
+    """
+    Uploads a file to S3 and runs `start_document_text_detection` on it. Textract processes the pages
+    in parallel on its side, and the Blocks of every page are collected into a single response.
+
+    Args:
+        - client (boto3.client): An initialized boto3 client for AWS Textract.
+        - s3_client (boto3.client): An initialized boto3 client for S3.
+        - file_path (Path): Path to the image or PDF/TIFF document.
+        - s3_uri (str): `s3://bucket/prefix` the file is uploaded under.
+        - rate_limiter (RateLimiter | None, optional): Token bucket acquired before starting the job. If None, it is not rate limited.
+
+    Returns:
+        - response (Dict[str, Any]): Textract response with the LINE Blocks of all pages.
+    """
+    bucket, prefix = split_s3_uri(s3_uri)
+    key: str = f"{prefix}/{file_path.name}".lstrip("/")
+    s3_client.upload_file(
+        str(file_path),
+        bucket,
+        key
+    )
+
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+
+    job_id: str = client.start_document_text_detection(
+        DocumentLocation = {"S3Object": {"Bucket": bucket, "Name": key}}
+    )["JobId"]
+
+    return _wait_for_text_detection(
+        client = client,
+        job_id = job_id
+    )
 
 # === Function to loop through the images ===
 def extract_image_data(
         client: boto3.client,
         image_folder_path: Path = Path("data/raw_images"),
-        to_process: List[str] | None = None
+        to_process: List[str] | None = None,
+        max_workers: int = 16,
+        s3_client: boto3.client = None,
+        s3_uri: str | None = None,
+        rate_limiter: RateLimiter | None = None
 ) -> Dict[str, Any]:
     """
     Extracts text data from the specified images in the folder using AWS Textract.
+    One thread reads the images from disk into a small bounded queue while a pool of workers
+    sends them to Textract, so disk reads and network calls overlap.
+    If an S3 location is given, multi-page documents (PDF/TIFF) and files larger than `ASYNC_SIZE_THRESHOLD` are uploaded
+    and processed with the asynchronous `start_document_text_detection` API instead, so they don't block the synchronous workers.
+    At most `max_workers` of those jobs run at once, and each job start goes through the same rate limiter.
 
     Args:
         - client (boto3.client): An initialized boto3 client for AWS Textract.
         - image_folder_path (Path, optional): Path to the folder containing images. Defaults to 'data/raw_images'.
         - to_process (List[str] | None, optional): List of image filenames to process. If None, all images will be processed.
+        - max_workers (int, optional): Maximum number of Textract calls in flight at once. Defaults to 16.
+        - s3_client (boto3.client, optional): An initialized boto3 client for S3, needed for the asynchronous path.
+        - s3_uri (str | None, optional): `s3://bucket/prefix` large files are uploaded under. If None, every file uses the synchronous path.
+        - rate_limiter (RateLimiter | None, optional): Token bucket acquired before every Textract request. If None, calls are not rate limited.
 
     Returns:
         - data_dict (Dict[str, Any]): Dictionary where keys are image filenames and values are Textract API responses.
     """
-    try:
-        ## === If there are no new images to process ===
-        if not to_process:
-            print("No new images to process.")
-            return {}
+    ## === If there are no new images to process ===
+    if not to_process:
+        print("No new images to process.")
+        return {}
 
-        ## === Initiating an empty dictionary ===
-        data_dict: Dict[str, Any] = {}
+    ## === Initiating an empty dictionary ===
+    data_dict: Dict[str, Any] = {}
 
-        ## === Looping through the images ===
+    ## === Split multi-page documents and large files off to the asynchronous S3 path ===
+    large_images: List[str] = []
+    if s3_client is not None and s3_uri:
         for img_name in to_process:
-            image_path: Path = image_folder_path / img_name
+            if DOCUMENT_PATTERN.search(img_name):
+                large_images.append(img_name)
+                continue
+            try:
+                if (image_folder_path / img_name).stat().st_size > ASYNC_SIZE_THRESHOLD:
+                    large_images.append(img_name)
+            except OSError:
+                continue
+    large_set = set(large_images)
+    small_images: List[str] = [img_name for img_name in to_process if img_name not in large_set]
+
+    ## === Asynchronous path: upload, start the job and poll it from its own thread ===
+    def _extract_async(img_name: str) -> None:
+        try:
+            data_dict[img_name] = extract_document_async(
+                client = client,
+                s3_client = s3_client,
+                file_path = image_folder_path / img_name,
+                s3_uri = s3_uri,
+                rate_limiter = rate_limiter
+            )
+            print(f"Processed: {img_name}")
+
+        except Exception as e:
+            print(f"Error processing {img_name}: {e}")
+
+    ## === Bounded queue so disk reads overlap with the Textract calls ===
+    image_queue: queue.Queue = queue.Queue(maxsize = 8)
+    workers: int = min(max_workers, len(small_images))
+
+    ## === Producer: reads the images one by one and feeds the queue ===
+    def _read_images() -> None:
+        try:
+            for img_name in small_images:
+                image_path: Path = image_folder_path / img_name
 
-            with open(image_path, "rb") as image:
-                img: bytearray = bytearray(image.read())
+                try:
+                    img: bytes = image_path.read_bytes()
+                except OSError as e:
+                    print(f"Error reading {img_name}: {e}")
+                    continue
+
+                image_queue.put((img_name, img))
+        finally:
+            ## === One sentinel per worker to signal completion ===
+            for _ in range(workers):
+                image_queue.put(None)
+
+    ## === Consumers: send the queued images to Textract ===
+    def _call_textract() -> None:
+        while (item := image_queue.get()) is not None:
+            img_name, img = item
 
             try:
+                if rate_limiter is not None:
+                    rate_limiter.acquire()
+
                 response = client.detect_document_text(
                     Document = {"Bytes": img}
                 )
@@ -50,21 +242,86 @@ def extract_image_data(
                 print(f"Error processing {img_name}: {e}")
                 continue
 
-        return data_dict
+    ## === Large files get their own pool, capped at `max_workers` jobs in flight (each thread polls one job) ===
+    with ThreadPoolExecutor(max_workers = max(min(max_workers, len(large_images)), 1)) as large_executor:
+        for img_name in large_images:
+            large_executor.submit(_extract_async, img_name)
 
-    except Exception as e:
-        raise e
+        if small_images:
+            with ThreadPoolExecutor(max_workers = workers + 1) as executor:
+                executor.submit(_read_images)
+                for _ in range(workers):
+                    executor.submit(_call_textract)
+
+    return data_dict
+
+# === Async variant of `extract_image_data` on a single event loop ===
+async def extract_image_data_async(
+        image_folder_path: Path = Path("data/raw_images"),
+        to_process: List[str] | None = None,
+        max_concurrency: int = 32,
+        rate_limiter: RateLimiter | None = None
+) -> Dict[str, Any]:
+    """
+    Extracts text data from the specified images with an aioboto3 Textract client, keeping up to
+    `max_concurrency` requests in flight on one event loop instead of one thread per request.
+    Every image goes through the synchronous `detect_document_text` API.
+
+    Args:
+        - image_folder_path (Path, optional): Path to the folder containing images. Defaults to 'data/raw_images'.
+        - to_process (List[str] | None, optional): List of image filenames to process.
+        - max_concurrency (int, optional): Maximum number of Textract calls in flight at once. Defaults to 32.
+        - rate_limiter (RateLimiter | None, optional): Token bucket awaited before every Textract request. If None, calls are not rate limited.
+
+    Returns:
+        - data_dict (Dict[str, Any]): Dictionary where keys are image filenames and values are Textract API responses.
+    """
+    ## === If there are no new images to process ===
+    if not to_process:
+        print("No new images to process.")
+        return {}
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with get_async_conn(service = "textract") as client:
+        async def _call_textract(img_name: str):
+            async with semaphore:
+                img: bytes = await asyncio.to_thread((image_folder_path / img_name).read_bytes)
+                if rate_limiter is not None:
+                    await rate_limiter.acquire_async()
+                return await client.detect_document_text(
+                    Document = {"Bytes": img}
+                )
+
+        responses = await asyncio.gather(
+            *(_call_textract(img_name) for img_name in to_process),
+            return_exceptions = True
+        )
+
+    data_dict: Dict[str, Any] = {}
+    for img_name, response in zip(to_process, responses):
+        if isinstance(response, Exception):
+            print(f"Error processing {img_name}: {response}")
+            continue
+
+        data_dict[img_name] = response
+        print(f"Processed: {img_name}")
+
+    return data_dict
 
 # === Function to extract the relevant data from the extracted data ===
 def get_relevant_data(
         data: Dict[str, Any],
-        save_data: bool = False
+        save_data: bool = False,
+        image_folder_path: Path = Path("data/raw_images")
 ) -> Dict[str, str]:
     """
     Extracts the relavant data needed from the response recieved from the Textract
 
     Args:
         - data (Dict[str, Any]): AWS Textract Output response
+        - save_data (bool, optional): Whether to append the texts to 'processed_text.jsonl'. Defaults to False.
+        - image_folder_path (Path, optional): Folder of the source images, whose (size, mtime) fingerprints are recorded when saving. Defaults to 'data/raw_images'.
 
     returns:
         - texts (Dict[str, str]): Dictionary where the key is the file name and the values are the relevant data.
@@ -73,17 +330,7 @@ def get_relevant_data(
         ## === Initiating an empty dictionary ===
         texts: Dict[str, str] = {}
 
-        ## === looping through the data ===
-        for filename, response in data.items():
-            lines: List = []
-
-            for block in response.get("Blocks", []):
-                if block.get("BlockType") == "LINE":
-                    lines.append(block.get("Text", ""))
-
-            texts[filename] = " ".join(lines).strip()
-
-        ## === Optional: Saving as JSON ===
+        ## === Optional: Saving as JSONL ===
         if save_data:
 
             ## === Path to the folder where to save the json data ===
@@ -93,43 +340,53 @@ def get_relevant_data(
                 exist_ok = True
             )
 
-            ## === Filename where to save ===
-            save_path: Path = data_path / "processed_text.json"
-
-            ## === Check if JSON already exists ===
-            if save_path.exists():
-                with open(
-                    save_path,
-                    "r",
-                    encoding = "utf-8"
-                ) as f:
-                    existing_data: Dict[str, str] = json.load(f)
-            else:
-                existing_data: Dict[str, str] = {}
-
-            ## === Merge old + new data ===
-            existing_data.update(texts)
-
-            ## === Save merged data ===
-            with open(
-                save_path,
-                "w",
-                encoding = "utf-8"
-            ) as f:
-                """
-                The file will store the merged extracted text dictionary as structured JSON data.
-                """
-                json.dump(
-                    existing_data,
-                    f,
-                    indent = 4,
-                    ensure_ascii = False
-                )
+            ## === Append-only sidecar of processed_text.json, merged back by open_file ===
+            save_path: Path = data_path / "processed_text.jsonl"
+
+        ## === looping through the data ===
+        for filename, response in data.items():
+            ## === Join the LINE blocks in one pass, without an intermediate list ===
+            texts[filename] = " ".join(
+                block.get("Text", "")
+                for block in response.get("Blocks", [])
+                if block.get("BlockType") == "LINE"
+            ).strip()
 
+        if save_data:
+            ## === Append only the new records (one buffered write pass) instead of rewriting the whole file ===
+            append_jsonl(
+                file_path = save_path,
+                records = texts
+            )
+
+            ## === Fold the sidecar back into the snapshot once it has outgrown it ===
+            maybe_compact_jsonl(data_path / "processed_text.json")
+
+            ## === Keep the key index in sync for the check_existing_extractions fast path ===
+            update_keys(
+                file_path = data_path / "processed_text.json",
+                new_keys = texts.keys()
+            )
+
+            ## === Fingerprint the source images so later edits get re-processed ===
+            fingerprints: Dict[str, Dict[str, int]] = {}
+            for filename in texts:
+                try:
+                    stat = (image_folder_path / filename).stat()
+                except OSError:
+                    continue
+                fingerprints[filename] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+            update_fingerprints(
+                new_fingerprints = fingerprints,
+                index_path = data_path / "processed_index.json"
+            )
             print(f"Processed data saved/updated at: {save_path}")
 
+        return texts
+
     except Exception as e:
-        raise ValueError(f"Error Processing Textract Data: {e}")
+        raise ValueError(f"Error Processing Textract Data: {e}") from e
 
 # === Function to get the old and new images ===
 def check_existing_extractions(
@@ -137,7 +394,9 @@ def check_existing_extractions(
         processed_file_path: Path = Path("data/processed_images/processed_text.json")
 ) -> Dict[str, List[str]]:
     """
-    Checks which image files are already processed and which are new.
+    Checks which image files are already processed and which are new or modified.
+    A file counts as modified when its size or mtime differs from the fingerprint recorded in 'processed_index.json';
+    processed files without a fingerprint (saved before the index existed) are kept as processed.
 
     Args:
         image_folder_path (Path): Folder containing raw images.
@@ -147,28 +406,33 @@ def check_existing_extractions(
         Dict[str, List[str]]:
             {
                 "to_process": [...],
-                "already_processed": [...]
+                "already_processed": [...],
+                "modified": [...]  (processed before, changed since; also in "to_process")
             }
     """
-    all_images = [
-        f for f in os.listdir(image_folder_path)
-        if f.lower().endswith((".png", ".jpg", ".jpeg"))
-    ]
-
-    # === If processed file exists ===
-    if processed_file_path.exists():
-        with open(processed_file_path, "r", encoding="utf-8") as f:
-            processed_data = json.load(f)
-        processed_files = set(processed_data.keys())
-    else:
-        processed_data = {}
-        processed_files = set()
-
-    # === Compare lists ===
-    to_process = [img for img in all_images if img not in processed_files]
-    already_processed = [img for img in all_images if img in processed_files]
+    # === Image files in the folder (scandir entries carry the file type, so no stat is needed to filter) ===
+    with os.scandir(image_folder_path) as entries:
+        images = {
+            entry.name: entry for entry in entries
+            if entry.is_file() and IMAGE_PATTERN.search(entry.name)
+        }
+
+    # === Already processed file names, from the `.keys` index when available ===
+    processed_files = read_keys(processed_file_path)
+    fingerprints = read_fingerprints(processed_file_path.with_name("processed_index.json"))
+
+    # === Compare names, then stat only the fingerprinted files ===
+    image_set = set(images)
+    modified: Set[str] = set()
+    for name in image_set & fingerprints.keys():
+        stat = images[name].stat()
+        if fingerprints[name] != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}:
+            modified.add(name)
+    to_process = sorted((image_set - processed_files) | modified)
+    already_processed = sorted((image_set & processed_files) - modified)
 
     return {
         "to_process": to_process,
-        "already_processed": already_processed
+        "already_processed": already_processed,
+        "modified": sorted(modified)
     }
\ No newline at end of file
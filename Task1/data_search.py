@@ -1,10 +1,21 @@
 # === Python Modules ===
+import os
 import numpy as np
 from fastapi import FastAPI, Query
-from typing import List
+from typing import List, Dict, Set, Tuple, Any
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from collections import defaultdict
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 from pathlib import Path
 
+# === Utils ===
+from Task1.utils.summary import SUMMARY_PARTITIONING
+
 # === FastAPI App ===
 app = FastAPI(
     title = "Medical Comprehend Search API",
@@ -12,17 +23,33 @@ app = FastAPI(
     version = "1.0"
 )
 
-# === Load all processed CSVs on startup ===
+# === Load all processed summaries on startup ===
 DATA_PATH = Path("data/processed_medical_data")
+DATASET_PATH = DATA_PATH / "all_summaries"
 merged_df = pd.DataFrame()
 
-if DATA_PATH.exists():
+if DATASET_PATH.exists():
+    ## === Partitioned Parquet dataset written by process_comprehend_results ===
+    merged_df = ds.dataset(
+        DATASET_PATH,
+        format = "parquet",
+        partitioning = SUMMARY_PARTITIONING
+    ).to_table().to_pandas(types_mapper = pd.ArrowDtype)
+    print(f"Loaded {merged_df['FileName'].nunique()} processed files with {len(merged_df)} total rows.")
+elif DATA_PATH.exists():
+    ## === Fallback to the per-file CSVs if the Parquet dataset was not generated yet ===
     all_csvs = list(DATA_PATH.glob("*_summary.csv"))
-    dfs = []
-    for csv_file in all_csvs:
-        df = pd.read_csv(csv_file)
-        df["FileName"] = csv_file.stem.replace("_summary", "")
-        dfs.append(df)
+
+    ## === The pyarrow reader releases the GIL, so the files are parsed in parallel ===
+    def _read_summary_csv(csv_file: Path) -> pd.DataFrame:
+        return pd.read_csv(
+            csv_file,
+            engine = "pyarrow",
+            dtype_backend = "pyarrow"
+        ).assign(FileName = csv_file.stem.removesuffix("_summary"))
+
+    with ThreadPoolExecutor(max_workers = os.cpu_count()) as executor:
+        dfs = list(executor.map(_read_summary_csv, all_csvs))
     if dfs:
         merged_df = pd.concat(dfs, ignore_index = True)
         print(f"Loaded {len(dfs)} processed files with {len(merged_df)} total rows.")
@@ -31,6 +58,98 @@ if DATA_PATH.exists():
 else:
     print("data/processed_medical directory not found.")
 
+## === Function to flatten the Attributes column into searchable text ===
+def _attributes_text(attributes: pd.Series) -> pd.Series:
+    """
+    Returns the Attributes column as `Type: Text | ...` strings, null where an entity has no attributes.
+    The Parquet dataset stores a `list<struct<Type, Text>>` column, which is joined with Arrow compute kernels;
+    the CSV fallback already holds the joined strings.
+    """
+    if not (isinstance(attributes.dtype, pd.ArrowDtype) and pa.types.is_list(attributes.dtype.pyarrow_dtype)):
+        return attributes.astype(pd.ArrowDtype(pa.string()))
+
+    lists = pa.array(attributes.array)
+    if isinstance(lists, pa.ChunkedArray):
+        lists = lists.combine_chunks()
+    pairs = pc.binary_join_element_wise(
+        lists.values.field("Type"),
+        lists.values.field("Text"),
+        ": "
+    )
+    joined = pc.binary_join(pa.ListArray.from_arrays(lists.offsets, pairs), " | ")
+    return pd.Series(
+        pc.if_else(pc.equal(joined, ""), pa.scalar(None, pa.string()), joined),
+        index = attributes.index,
+        dtype = pd.ArrowDtype(pa.string())
+    )
+
+## === One response shape for both sources: Attributes as the joined string, then one lowercased search column so each request is a single scan ===
+if not merged_df.empty:
+    merged_df["Attributes"] = _attributes_text(merged_df["Attributes"])
+    merged_df["_blob"] = (
+        merged_df["Text"].fillna("").astype(str) + "\x1f" +
+        merged_df["Category"].fillna("").astype(str) + "\x1f" +
+        merged_df["Type"].fillna("").astype(str) + "\x1f" +
+        merged_df["Attributes"].fillna("")
+    ).str.lower().astype("string[pyarrow]")
+
+## === Function to split a string into its distinct trigrams ===
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+## === Trigram index (trigram -> row ids) so selective queries only verify a few candidate rows ===
+trigram_index: Dict[str, array] = {}
+blob_values: List[str] = []
+if not merged_df.empty:
+    blob_values = merged_df["_blob"].tolist()
+    postings = defaultdict(lambda: array("i"))
+    for row_id, text in enumerate(blob_values):
+        for gram in _trigrams(text):
+            postings[gram].append(row_id)
+    trigram_index = dict(postings)
+
+# === Cached search over the in-memory data (loaded once, so entries never go stale) ===
+@lru_cache(maxsize = 1024)
+def _search(
+        query_lower: str,
+        limit: int
+) -> Tuple[Dict[str, Any], ...]:
+    """
+    Returns the first `limit` rows whose search column contains `query_lower`, as a tuple of JSON ready records.
+    """
+    ## === Narrow down to rows containing every trigram of the query (shortest posting list first) ===
+    if len(query_lower) >= 3:
+        posting_lists = sorted(
+            (trigram_index.get(gram, array("i")) for gram in _trigrams(query_lower)),
+            key = len
+        )
+        candidates = set(posting_lists[0])
+        for posting in posting_lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+
+        ## === Verify the few candidates with a plain substring check (no regex, no Series round trip) ===
+        matched_rows = [
+            row_id for row_id in sorted(candidates)
+            if query_lower in blob_values[row_id]
+        ][:limit]
+    else:
+        ## === Queries too short for trigrams fall back to one vectorized literal scan ===
+        blob = merged_df["_blob"]
+        matched_rows = np.flatnonzero(
+            blob.str.contains(query_lower, regex = False, na = False).to_numpy(dtype = bool)
+        )[:limit]
+
+    results = merged_df.iloc[matched_rows].drop(columns = "_blob")
+
+    ## === Clean up invalid float values for JSON serialization ===
+    numeric_columns = results.select_dtypes(include = "number").columns
+    results = results.astype({column: object for column in numeric_columns})
+    results[numeric_columns] = results[numeric_columns].replace([np.nan, np.inf, -np.inf], None)
+
+    return tuple(results.to_dict(orient = "records"))
+
 @app.get("/search")
 def search_entities(
     query: str = Query(..., description = "Keyword to search in extracted medical entities."),
@@ -43,25 +162,15 @@ def search_entities(
     if merged_df.empty:
         return {"message": "No processed data available."}
 
-    ## === Case-insensitive search ===
-    mask = (
-        merged_df["Text"].astype(str).str.contains(query, case = False, na = False) |
-        merged_df["Category"].astype(str).str.contains(query, case = False, na = False) |
-        merged_df["Type"].astype(str).str.contains(query, case = False, na = False) |
-        merged_df["Attributes"].astype(str).str.contains(query, case = False, na = False)
-    )
-
-    results = merged_df[mask].head(limit)
+    ## === Case-insensitive search (repeated queries are served from the cache) ===
+    results = _search(query.lower(), limit)
 
-    if results.empty:
+    if not results:
         return {"message": f"No matches found for '{query}'."}
 
-    ## === Clean up invalid float values for JSON serialization ===
-    results = results.replace([np.nan, np.inf, -np.inf], None)
-
     ## === Convert to list of dicts for JSON response ===
     return {
         "query": query,
         "total_results": len(results),
-        "results": results.to_dict(orient="records")
-    }
\ No newline at end of file
+        "results": list(results)
+    }
@@ -24,7 +24,7 @@ def main():
         comprehend_data = comprehend_pipeline.extract_info(data_dict = data_dict)
 
         ## === Summarization ===
-        results = process_comprehend_results(comprehend_data = comprehend_data, save_data = True)
+        process_comprehend_results(comprehend_data = comprehend_data, save_data = True, materialize = False)
 
     except Exception as e:
         raise e
@@ -1,12 +1,15 @@
 # === Python Modules ===
 import os
+import asyncio
 from pathlib import Path
 from typing import Dict
 
 # === Components ===
 from Task1.components.comprehend import (
     check_existing_comprehend,
-    extract_medical_entities
+    extract_medical_entities,
+    extract_medical_entities_async,
+    extract_medical_entities_batch
 )
 
 # === Utils ===
@@ -14,6 +17,11 @@ from Task1.utils.common import (
     get_conn,
     open_file
 )
+from Task1.utils.store import EntityStore
+from Task1.utils.rate_limit import RateLimiter
+
+## === Above this many new files, use the asynchronous batch job instead of per-file calls ===
+BATCH_THRESHOLD: int = 50
 
 # === Main Comprehend Body ===
 class ComprehendPipeline:
@@ -22,27 +30,54 @@ class ComprehendPipeline:
     """
 
     def __init__(
-            self
+            self,
+            max_workers: int = 16,
+            use_async: bool = False,
+            requests_per_second: float | None = 5.0
     ):
         """
         Initializes the ComprehendPipeline by setting up default paths and AWS client.
+
+        Args:
+            - max_workers (int, optional): Number of concurrent AWS calls. Defaults to 16.
+            - use_async (bool, optional): Run the per-file calls on an aioboto3 event loop instead of a thread pool (needs `aioboto3`). Defaults to False.
+            - requests_per_second (float | None, optional): Client-side rate limit of the per-file calls, kept under the account quota. None disables it. Defaults to 5.0.
         """
+        ## === Concurrency of the per-file AWS calls ===
+        self.max_workers: int = max_workers
+        self.use_async: bool = use_async
+
+        ## === Token bucket shared by all workers of this pipeline ===
+        self.rate_limiter: RateLimiter | None = (
+            RateLimiter(rate = requests_per_second) if requests_per_second else None
+        )
+
         ## === Default data directory path ===
         self.file_path: Path = Path("data")
 
         ## === AWS client placeholder (will be initialized during extraction) ===
         self.client = None
 
+        ## === Append-only store of Comprehend Medical responses ===
+        self.store: EntityStore | None = None
+
+        ## === S3 locations + IAM role for the batch job (batch mode is off unless all are set) ===
+        self.s3_input_uri: str | None = os.getenv("COMPREHEND_S3_INPUT_URI")
+        self.s3_output_uri: str | None = os.getenv("COMPREHEND_S3_OUTPUT_URI")
+        self.role_arn: str | None = os.getenv("COMPREHEND_ROLE_ARN")
+
     def extract_info(self, data_dict):
         """
         Uses AWS Comprehend Medical to analyze and extract key medical entities such as conditions, medications, treatments, and test results from the previously extracted text data.
         """
-        ## === Using a Flag to make sure AWS Comprehend Medical doesn't run on every run ===
-        flag_dict: Dict[str, str] = check_existing_comprehend()
+        ## === Using a Flag (from the store index) to make sure AWS Comprehend Medical doesn't run on every run ===
+        self.store = EntityStore(self.file_path / "processed_medical" / "processed_entities.json")
+        flag_dict: Dict[str, str] = check_existing_comprehend(store = self.store)
 
         if not flag_dict.get("to_analyze", []):
             print("No new comprehend run needed.")
             print(flag_dict.get("to_analyze"))
+            self.store.close()
             comprehend_data = open_file(file_path = Path("data/processed_medical/processed_entities.json"))
             return comprehend_data
 
@@ -53,13 +88,56 @@ class ComprehendPipeline:
             )
 
             ## === Step 2: Extracting the medical data from the textract output ===
-            _ = extract_medical_entities(
-                client = self.client,
-                text_data = data_dict,
-                save_data = True,
-                to_process = flag_dict.get("to_analyze")
+            os.makedirs(
+                self.file_path / "processed_medical",
+                exist_ok = True
+            )
+            to_analyze = flag_dict.get("to_analyze")
+            use_batch: bool = (
+                len(to_analyze) > BATCH_THRESHOLD
+                and all([self.s3_input_uri, self.s3_output_uri, self.role_arn])
             )
 
+            with self.store:
+                if use_batch:
+                    _ = extract_medical_entities_batch(
+                        client = self.client,
+                        s3_client = get_conn(service = "s3"),
+                        text_data = data_dict,
+                        s3_input_uri = self.s3_input_uri,
+                        s3_output_uri = self.s3_output_uri,
+                        role_arn = self.role_arn,
+                        to_process = to_analyze,
+                        save_data = True,
+                        store = self.store
+                    )
+                elif self.use_async:
+                    _ = asyncio.run(
+                        extract_medical_entities_async(
+                            text_data = data_dict,
+                            save_data = True,
+                            to_process = to_analyze,
+                            max_concurrency = self.max_workers,
+                            store = self.store,
+                            rate_limiter = self.rate_limiter
+                        )
+                    )
+                else:
+                    _ = extract_medical_entities(
+                        client = self.client,
+                        text_data = data_dict,
+                        save_data = True,
+                        to_process = to_analyze,
+                        max_workers = self.max_workers,
+                        store = self.store,
+                        rate_limiter = self.rate_limiter
+                    )
+
+            ## === Structured summaries (Task2) of re-analyzed files are out of date: removing them queues a new summary ===
+            for name in to_analyze:
+                if name in self.store:
+                    (self.file_path / "structured_json" / f"{name}_summary.json").unlink(missing_ok = True)
+
             print("Comprehend Pipeline completed successfully.")
             comprehend_data = open_file(file_path = Path("data/processed_medical/processed_entities.json"))
             return comprehend_data
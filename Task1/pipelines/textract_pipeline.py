@@ -1,11 +1,13 @@
 # === Python Module ===
 import os
+import asyncio
 from pathlib import Path
 
 # === Components ===
 from Task1.components.extraction import (
     check_existing_extractions,
     extract_image_data,
+    extract_image_data_async,
     get_relevant_data
 )
 
@@ -14,6 +16,8 @@ from Task1.utils.common import (
     get_conn,
     open_file
 )
+from Task1.utils.store import EntityStore
+from Task1.utils.rate_limit import RateLimiter
 
 # === Main Data Extraction Body ===
 class TextractPipeline:
@@ -22,14 +26,34 @@ class TextractPipeline:
     """
 
     def __init__(
-            self
+            self,
+            max_workers: int = 16,
+            use_async: bool = False,
+            requests_per_second: float | None = 5.0
     ):
         """
         Initializes the TextractPipeline by setting up default paths and AWS client.
+
+        Args:
+            - max_workers (int, optional): Number of concurrent AWS calls. Defaults to 16.
+            - use_async (bool, optional): Run the per-file calls on an aioboto3 event loop instead of a thread pool (needs `aioboto3`). Defaults to False.
+            - requests_per_second (float | None, optional): Client-side rate limit of the per-file calls, kept under the account quota. None disables it. Defaults to 5.0.
         """
+        ## === Concurrency of the per-file AWS calls ===
+        self.max_workers: int = max_workers
+        self.use_async: bool = use_async
+
+        ## === Token bucket shared by all workers of this pipeline ===
+        self.rate_limiter: RateLimiter | None = (
+            RateLimiter(rate = requests_per_second) if requests_per_second else None
+        )
+
         ## === AWS client placeholder (will be initialized during extraction) ===
         self.client = None
 
+        ## === S3 location for large files (asynchronous Textract path is off unless set) ===
+        self.s3_uri: str | None = os.getenv("TEXTRACT_S3_URI")
+
     # === Main function for data extraction ===
     def extract_data(self):
         """
@@ -37,8 +61,9 @@ class TextractPipeline:
 
         This function ensures that:
             1. Previously processed images are skipped.
-            2. Only new or unprocessed images are sent to AWS Textract.
+            2. Only new, unprocessed or modified images are sent to AWS Textract.
             3. Extracted text data is cleaned, structured, and merged as JSON.
+            4. The Comprehend entities of modified images are discarded, so the later stages regenerate them.
 
         Returns:
             - data_dict (Dict[str, str]): Dictionary containing filenames as keys and extracted text as values.
@@ -53,24 +78,46 @@ class TextractPipeline:
             return data_dict
 
         try:
-            ## === Step 1: Making the connection (only if not already initialized) ===
-            if not self.client:
-                self.client = get_conn(
-                    service = "textract"
+            ## === Steps 1 + 2: Extracting the data on an event loop (the async client is opened inside) ===
+            if self.use_async:
+                data = asyncio.run(
+                    extract_image_data_async(
+                        to_process = flag_dict.get("to_process"),
+                        max_concurrency = self.max_workers,
+                        rate_limiter = self.rate_limiter
+                    )
                 )
 
-            ## === Step 2: Extracting the data from the images ===
-            data = extract_image_data(
-                client = self.client,
-                to_process = flag_dict.get("to_process")
-            )
+            else:
+                ## === Step 1: Making the connection (only if not already initialized) ===
+                if not self.client:
+                    self.client = get_conn(
+                        service = "textract"
+                    )
+
+                ## === Step 2: Extracting the data from the images ===
+                data = extract_image_data(
+                    client = self.client,
+                    to_process = flag_dict.get("to_process"),
+                    max_workers = self.max_workers,
+                    s3_client = get_conn(service = "s3") if self.s3_uri else None,
+                    s3_uri = self.s3_uri,
+                    rate_limiter = self.rate_limiter
+                )
 
             ## === Step 3: Extracting relevant data and saving it as JSON ===
-            _ = get_relevant_data(
+            texts = get_relevant_data(
                 data = data,
                 save_data = True
             )
 
+            ## === Step 4: Modified images got new text, so their Comprehend entities (and everything after) are out of date ===
+            refreshed = [name for name in flag_dict.get("modified", []) if name in texts]
+            if refreshed:
+                with EntityStore(Path("data/processed_medical/processed_entities.json")) as store:
+                    store.discard(refreshed)
+                print(f"Re-extracted {len(refreshed)} modified images, queued for a new Comprehend run.")
+
             print("Extraction pipeline completed successfully.")
             data_dict = open_file()
             return data_dict
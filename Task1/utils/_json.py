@@ -0,0 +1,27 @@
+# === Python Modules ===
+import orjson
+from typing import Any
+
+## === Single place for JSON (de)serialization, backed by orjson (C, bytes in / bytes out) ===
+loads = orjson.loads
+
+# === Function to serialize an object to JSON bytes ===
+def dumps(
+        obj: Any,
+        pretty: bool = False
+) -> bytes:
+    """
+    Serializes an object to JSON bytes with orjson. Non-string dict keys are stringified like the stdlib does.
+
+    Args:
+        - obj (Any): JSON serializable object.
+        - pretty (bool, optional): Indent the output with 2 spaces, for files meant to be read by people. Defaults to False.
+
+    Returns:
+        - bytes: UTF-8 encoded JSON.
+    """
+    option = orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+
+    return orjson.dumps(obj, option = option)
@@ -1,62 +1,372 @@
 # === Python Modules ===
 import os
 import boto3
-import json
+from botocore.config import Config
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Dict, Any, List, Set, Iterable, Mapping, Tuple
+
+# === Utils ===
+from Task1.utils import _json
+
+# === Function to build the default botocore client config ===
+def default_config(
+        region_name: str = "ap-southeast-2"
+) -> Config:
+    """
+    Keep-alive + enlarged pool so concurrent calls don't queue or re-handshake, with adaptive retries.
+
+    Args:
+        - region_name (str, optional): AWS region of the service. Defaults to 'ap-southeast-2'.
+
+    Returns:
+        - config (Config): botocore client config shared by the sync and async clients.
+    """
+    return Config(
+        region_name = region_name,
+        max_pool_connections = 64,
+        tcp_keepalive = True,
+        connect_timeout = 3,
+        read_timeout = 30,
+        retries = {
+            "max_attempts": 10,
+            "mode": "adaptive"
+        }
+    )
+
+# === Function to get the boto3 session shared by every client ===
+@lru_cache(maxsize = None)
+def _get_session() -> boto3.session.Session:
+    """
+    Creates the boto3 session once, so the credential provider chain and endpoint data are resolved a single time for all services.
+    """
+    return boto3.session.Session()
 
 # === Functoin to create connection to aws ===
+@lru_cache(maxsize = None)
 def get_conn(
         service: str,
-        region_name: str = "ap-southeast-2"
+        region_name: str = "ap-southeast-2",
+        config: Config | None = None
 ) -> boto3.client:
     """
     Creates a connection to the aws.
+    The client is cached per (service, region_name, config) and built from one shared session, so every pipeline reuses the same connection pool.
 
     Args: 
         - service (str): Name of the service to use in the aws. In this case `textract` or `comprehend`.
+        - region_name (str, optional): AWS region of the service. Defaults to 'ap-southeast-2'.
+        - config (Config | None, optional): botocore client config. If None, a keep-alive config with an enlarged pool and adaptive retries is used.
 
     returns:
         - connection (boto3.Client): A low-level client representing the AWS service specified.
     """
+    if config is None:
+        config = default_config(region_name)
+
+    connection = _get_session().client(
+        service,
+        config = config
+    )
+
+    return connection
+
+# === Function to create an async connection to aws ===
+def get_async_conn(
+        service: str,
+        region_name: str = "ap-southeast-2",
+        config: Config | None = None
+):
+    """
+    Creates an async (aioboto3) client for the aws service, to be used as `async with get_async_conn(...) as client`.
+    Needs the optional `aioboto3` package.
+
+    Args:
+        - service (str): Name of the service to use in the aws. In this case `textract` or `comprehendmedical`.
+        - region_name (str, optional): AWS region of the service. Defaults to 'ap-southeast-2'.
+        - config (Config | None, optional): botocore client config. If None, the same config as `get_conn` is used.
+
+    returns:
+        - connection: An async context manager yielding the aioboto3 client.
+    """
     try:
-        connection = boto3.client(
-            service,
-            region_name = region_name
+        import aioboto3
+    except ImportError as e:
+        raise ImportError("The async pipeline needs `aioboto3`: pip install aioboto3") from e
+
+    return aioboto3.Session().client(
+        service,
+        config = config or default_config(region_name)
+    )
+
+# === Function to split an `s3://bucket/prefix` uri into bucket and key prefix ===
+def split_s3_uri(
+        uri: str
+) -> Tuple[str, str]:
+    """
+    Splits an `s3://bucket/prefix` uri into its bucket and key prefix (without surrounding slashes).
+
+    Args:
+        - uri (str): S3 uri, e.g. 's3://my-bucket/some/prefix'.
+
+    Returns:
+        - Tuple[str, str]: (bucket, prefix)
+    """
+    bucket, _, prefix = uri.removeprefix("s3://").partition("/")
+    return bucket, prefix.strip("/")
+
+# === Function to append a single record to a JSONL file ===
+def append_jsonl(
+        file_path: Path,
+        records: Dict[str, Any]
+) -> None:
+    """
+    Appends every `{"k": key, "v": value}` record as a line to the given JSONL file,
+    so saving new results costs O(new records) instead of rewriting the whole file.
+    The file is opened once with a 1 MiB buffer, so a batch of records is flushed in a few large writes.
+
+    Args:
+        - file_path (Path): Path to the JSONL file. Created if it does not exist.
+        - records (Dict[str, Any]): Records to append, keyed by record key (usually the file name).
+    """
+    with open(file_path, "ab", buffering = 1 << 20) as f:
+        for key, value in records.items():
+            f.write(_json.dumps({"k": key, "v": value}) + b"\n")
+
+# === Function to load a JSONL file into a dictionary ===
+def load_jsonl(
+        file_path: Path
+) -> Dict[str, Any]:
+    """
+    Loads a JSONL file written by `append_jsonl` into a dictionary. Later lines win on duplicate keys.
+    A last line without its newline (an interrupted append) is ignored.
+
+    Args:
+        - file_path (Path): Path to the JSONL file.
+
+    Returns:
+        - data_dict (Dict[str, Any]): Dictionary of keys to values. Empty if the file does not exist.
+    """
+    data_dict: Dict[str, Any] = {}
+
+    if not file_path.exists():
+        return data_dict
+
+    ## === Large read buffer so iterating the lines doesn't issue many small reads ===
+    with open(file_path, "rb", buffering = 1 << 20) as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                record = _json.loads(line)
+                data_dict[record["k"]] = record["v"]
+
+    return data_dict
+
+# === Function to read the set of already saved keys ===
+def read_keys(
+        file_path: Path
+) -> Set[str]:
+    """
+    Reads the keys (file names) saved under the given JSON snapshot from its small `.keys` index,
+    so callers that only need the names don't have to parse the full data.
+    Falls back to loading the snapshot + JSONL sidecar when the index does not exist yet.
+
+    Args:
+        - file_path (Path): Path to the JSON snapshot (e.g. 'data/processed_images/processed_text.json').
+
+    Returns:
+        - keys (Set[str]): Set of saved keys. Empty if nothing was saved yet.
+    """
+    keys_path: Path = file_path.with_suffix(".keys")
+
+    if keys_path.exists():
+        return set(_json.loads(keys_path.read_bytes()))
+
+    if file_path.exists() or file_path.with_suffix(".jsonl").exists():
+        return set(open_file(file_path).keys())
+
+    return set()
+
+# === Function to update the `.keys` index of a JSON snapshot ===
+def update_keys(
+        file_path: Path,
+        new_keys: Iterable[str]
+) -> None:
+    """
+    Adds the given keys to the `.keys` index next to the JSON snapshot.
+    The index is written to a temporary file and swapped in with `os.replace`, so readers never see a partial file.
+
+    Args:
+        - file_path (Path): Path to the JSON snapshot (e.g. 'data/processed_images/processed_text.json').
+        - new_keys (Iterable[str]): Keys that were just saved.
+    """
+    keys_path: Path = file_path.with_suffix(".keys")
+    tmp_path: Path = file_path.with_suffix(".keys.tmp")
+
+    keys: Set[str] = read_keys(file_path)
+    keys.update(new_keys)
+
+    tmp_path.write_bytes(_json.dumps(sorted(keys)))
+    os.replace(tmp_path, keys_path)
+
+# === Function to read the (size, mtime) fingerprints of processed files ===
+def read_fingerprints(
+        index_path: Path = Path("data/processed_images/processed_index.json")
+) -> Dict[str, Dict[str, int]]:
+    """
+    Reads the resume index `{name: {"size": ..., "mtime_ns": ...}}` of already processed files.
+
+    Args:
+        - index_path (Path, optional): Path to the resume index. Defaults to 'data/processed_images/processed_index.json'.
+
+    Returns:
+        - Dict[str, Dict[str, int]]: Fingerprint of every processed file (empty if the index does not exist yet).
+    """
+    if not index_path.exists():
+        return {}
+
+    return _json.loads(index_path.read_bytes())
+
+# === Function to record the fingerprints of newly processed files ===
+def update_fingerprints(
+        new_fingerprints: Dict[str, Dict[str, int]],
+        index_path: Path = Path("data/processed_images/processed_index.json")
+) -> None:
+    """
+    Merges the given fingerprints into the resume index, swapping the file in with `os.replace`.
+
+    Args:
+        - new_fingerprints (Dict[str, Dict[str, int]]): `{name: {"size": ..., "mtime_ns": ...}}` of the files just saved.
+        - index_path (Path, optional): Path to the resume index. Defaults to 'data/processed_images/processed_index.json'.
+    """
+    fingerprints = read_fingerprints(index_path)
+    fingerprints.update(new_fingerprints)
+
+    tmp_path: Path = index_path.with_suffix(".json.tmp")
+    tmp_path.write_bytes(_json.dumps(fingerprints))
+    os.replace(tmp_path, index_path)
+
+# === Function to fold a JSONL sidecar back into its JSON snapshot ===
+def compact_jsonl(
+        file_path: Path
+) -> Dict[str, Any]:
+    """
+    Merges the `.jsonl` sidecar into the JSON snapshot at `file_path` and removes the sidecar.
+    The snapshot is written to a temporary file and swapped in with `os.replace`, so a crash never leaves it half written.
+
+    Args:
+        - file_path (Path): Path to the JSON snapshot (e.g. 'data/processed_images/processed_text.json').
+
+    Returns:
+        - data_dict (Dict[str, Any]): The merged dictionary that was written.
+    """
+    data_dict: Dict[str, Any] = dict(open_file(file_path))
+
+    tmp_path: Path = file_path.with_suffix(".json.tmp")
+    with open(
+        tmp_path,
+        "wb",
+        buffering = 1 << 20
+    ) as f:
+        f.write(
+            _json.dumps(data_dict)
         )
+    os.replace(tmp_path, file_path)
 
-    except Exception as e:
-        raise e
+    file_path.with_suffix(".jsonl").unlink(missing_ok = True)
 
-    return connection
+    return data_dict
+
+# === Function to compact the JSONL sidecar once it has grown large ===
+def maybe_compact_jsonl(
+        file_path: Path,
+        min_bytes: int = 64 << 20
+) -> bool:
+    """
+    Compacts the `.jsonl` sidecar into the snapshot once it is larger than both `min_bytes` and the snapshot itself.
+    Compacting only after the sidecar has doubled the data keeps the amortized save cost O(new records).
+
+    Args:
+        - file_path (Path): Path to the JSON snapshot (e.g. 'data/processed_images/processed_text.json').
+        - min_bytes (int, optional): Sidecar size below which nothing is compacted. Defaults to 64 MiB.
+
+    Returns:
+        - bool: Whether the sidecar was compacted.
+    """
+    sidecar_path: Path = file_path.with_suffix(".jsonl")
+    if not sidecar_path.exists():
+        return False
+
+    snapshot_size: int = file_path.stat().st_size if file_path.exists() else 0
+    if sidecar_path.stat().st_size <= max(min_bytes, snapshot_size):
+        return False
+
+    compact_jsonl(file_path)
+    return True
+
+# === Function to fingerprint a file for cache invalidation ===
+def _stat_key(
+        file_path: Path
+) -> Tuple[int, int, int] | None:
+    """
+    Returns (mtime_ns, size, inode) of the file, or None if it does not exist.
+    """
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+# === Cached loader behind open_file (re-read only when the snapshot or sidecar changes) ===
+@lru_cache(maxsize = 128)
+def _load_cached(
+        file_path: Path,
+        snapshot_key: Tuple[int, int, int] | None,
+        sidecar_key: Tuple[int, int, int] | None
+) -> Mapping[str, Any]:
+    """
+    Loads the JSON snapshot and merges its `.jsonl` sidecar on top. The stat keys are only part of the cache key.
+    """
+    data_dict: Dict[str, Any] = {}
+    if snapshot_key is not None:
+        with open(
+            file_path,
+            "rb"
+        ) as f:
+            data_dict = _json.loads(f.read())
+
+    ## === Merge the appended records ===
+    data_dict.update(load_jsonl(file_path.with_suffix(".jsonl")))
+
+    ## === Read-only view, so callers can't mutate the cached dictionary ===
+    return MappingProxyType(data_dict)
 
 # === Function to Open the already saved Extracted Data ===
 def open_file(
         file_path: Path = Path("data/processed_images/processed_text.json")
-) -> Dict[str, Any]:
+) -> Mapping[str, Any]:
     """
     Opens and loads the saved extracted text data from the given JSON file.
+    Records appended to the `.jsonl` sidecar next to it are merged on top of the JSON snapshot.
+    Results are cached on the (mtime, size, inode) of both files, so repeated calls skip the parse until either file changes.
 
     Args:
         - file_path (Path, optional): Path to the saved JSON file containing the extracted text data. Defaults to 'data/processed_images/processed_text.json'.
 
     Returns:
-        - data_dict (Dict[str, Any]): Dictionary where keys are filenames and values are the extracted text.
+        - data_dict (Mapping[str, Any]): Read-only mapping where keys are filenames and values are the extracted text.
     """
     try:
+        snapshot_key = _stat_key(file_path)
+        sidecar_key = _stat_key(file_path.with_suffix(".jsonl"))
+
         ## === Check if the file exists ===
-        if not file_path.exists():
+        if snapshot_key is None and sidecar_key is None:
             raise FileNotFoundError(f"The specified file does not exist: {file_path}")
 
-        ## === Opens and loads the file ===
-        with open(
-            file_path,
-            "r",
-            encoding = "utf-8"
-        ) as f:
-            data_dict: Dict[str, Any] = json.load(f)
-
-        return data_dict
+        return _load_cached(file_path, snapshot_key, sidecar_key)
 
     except Exception as e:
-        ValueError(f"Error Reading file: {e}")
\ No newline at end of file
+        raise ValueError(f"Error Reading file: {e}") from e
@@ -0,0 +1,61 @@
+# === Python Modules ===
+import time
+import asyncio
+import threading
+
+# === Client-side token bucket for the AWS calls ===
+class RateLimiter:
+    """
+    Token bucket that keeps the submitted requests per second under the account quota.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. Every call reserves one token;
+    if the bucket is empty the caller sleeps until its reserved token is available, so concurrent
+    callers (threads or coroutines) are spaced out instead of bursting into throttling errors.
+    """
+
+    def __init__(
+            self,
+            rate: float = 5.0,
+            capacity: float | None = None
+    ):
+        """
+        Initializes the RateLimiter with a full bucket.
+
+        Args:
+            - rate (float, optional): Tokens added per second, i.e. the sustained requests per second. Defaults to 5.0.
+            - capacity (float | None, optional): Maximum burst size. Defaults to `rate`.
+        """
+        self.rate: float = rate
+        self.capacity: float = capacity if capacity is not None else rate
+
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Takes one token (the balance may go negative) and returns how long the caller has to wait for it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> None:
+        """
+        Blocks the calling thread until a token is available.
+        """
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """
+        Waits on the event loop (without blocking it) until a token is available.
+        """
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
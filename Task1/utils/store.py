@@ -0,0 +1,245 @@
+# === Python Modules ===
+import os
+import mmap
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Set, Tuple
+
+# === Utils ===
+from Task1.utils import _json
+from Task1.utils.common import open_file
+
+# === Append-only store for AWS Comprehend Medical responses ===
+class EntityStore:
+    """
+    Append-only store for AWS Comprehend Medical responses.
+
+    New responses are appended as `{"k": name, "v": response}` lines to the `.jsonl` sidecar of the JSON snapshot
+    (the same format `open_file` merges), and an `.idx` file maps every file name to the (offset, length) of its line.
+    Membership checks only read the index, and single records are read back through `mmap` without loading the rest.
+    The index also records the sidecar size it covers, so records appended by a run that never reached `close()` are picked up on load.
+    Names that only exist in the older JSON snapshot are indexed with `None` and read from the snapshot.
+    Discarded names (e.g. whose source text changed) are dropped from the index until they are stored again.
+    """
+
+    def __init__(
+            self,
+            file_path: Path = Path("data/processed_medical/processed_entities.json")
+    ):
+        """
+        Initializes the EntityStore and loads (or rebuilds) its index.
+
+        Args:
+            - file_path (Path, optional): Path to the JSON snapshot. Defaults to 'data/processed_medical/processed_entities.json'.
+        """
+        self.file_path: Path = file_path
+        self.data_path: Path = file_path.with_suffix(".jsonl")
+        self.idx_path: Path = file_path.with_suffix(".idx")
+
+        ## === Append handle and snapshot cache (opened lazily) ===
+        self._file = None
+        self._snapshot: Dict[str, Any] | None = None
+        self._dirty: bool = False
+
+        ## === Names discarded since they were stored, kept in the `.idx` so a rebuild doesn't bring them back ===
+        self.discarded: Set[str] = set()
+
+        self.index: Dict[str, Tuple[int, int] | None] = self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_index(self) -> Dict[str, Tuple[int, int] | None]:
+        """
+        Loads the `.idx` file, or rebuilds it once from the snapshot and the JSONL sidecar if it is missing.
+        The `.idx` records how many sidecar bytes it covers, so lines appended after the last `close()`
+        (e.g. by a run that crashed) are indexed from that offset instead of being missed.
+        """
+        if self.idx_path.exists():
+            saved = _json.loads(self.idx_path.read_bytes())
+            self.discarded = set(saved.get("discarded", ())) if "sidecar_size" in saved else set()
+
+            ## === Older `.idx` files hold only the index, without the covered size: rebuilt below ===
+            if isinstance(saved.get("records"), dict) and "sidecar_size" in saved:
+                index: Dict[str, Tuple[int, int] | None] = {
+                    key: tuple(value) if value is not None else None
+                    for key, value in saved["records"].items()
+                }
+                covered: int = saved["sidecar_size"]
+                sidecar_size: int = self.data_path.stat().st_size if self.data_path.exists() else 0
+
+                if sidecar_size == covered:
+                    return index
+
+                ## === Index the lines appended after the `.idx` was written (a shrunk sidecar is rebuilt) ===
+                if sidecar_size > covered:
+                    self.discarded -= self._scan_sidecar(index, covered)
+                    self._dirty = True
+                    return index
+
+        index: Dict[str, Tuple[int, int] | None] = {}
+
+        ## === Names only saved in the JSON snapshot ===
+        if self.file_path.exists():
+            self._snapshot = _json.loads(self.file_path.read_bytes())
+            index.update(dict.fromkeys(self._snapshot))
+
+        ## === Offsets of the lines in the JSONL sidecar, without the discarded names ===
+        self._scan_sidecar(index, 0)
+        for name in self.discarded:
+            index.pop(name, None)
+
+        self._dirty = bool(index)
+        return index
+
+    def _scan_sidecar(
+            self,
+            index: Dict[str, Tuple[int, int] | None],
+            offset: int
+    ) -> Set[str]:
+        """
+        Adds the (offset, length) of every complete sidecar line from `offset` on to the index (later lines win),
+        and returns the names it saw. A last line without its newline (an interrupted write) is ignored.
+        """
+        names: Set[str] = set()
+        if not self.data_path.exists():
+            return names
+
+        with open(self.data_path, "rb", buffering = 1 << 20) as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                record = line.rstrip(b"\n")
+                if record.strip():
+                    name = _json.loads(record)["k"]
+                    index[name] = (offset, len(record))
+                    names.add(name)
+                offset += len(line)
+
+        return names
+
+    def keys(self) -> List[str]:
+        """
+        Returns the names of all stored responses.
+        """
+        return list(self.index.keys())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def _open_sidecar(self):
+        """
+        Opens the sidecar for appending, first cutting off a last line left without its newline by an interrupted write.
+        """
+        f = open(self.data_path, "ab+", buffering = 1 << 20)
+
+        size: int = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+            f.seek(0, os.SEEK_END)
+
+        return f
+
+    def put(
+            self,
+            name: str,
+            response: Dict[str, Any]
+    ) -> None:
+        """
+        Appends a response to the JSONL sidecar and records its position in the index.
+
+        Args:
+            - name (str): File name the response belongs to.
+            - response (Dict[str, Any]): AWS Comprehend Medical API response.
+        """
+        if self._file is None:
+            self._file = self._open_sidecar()
+
+        offset = self._file.tell()
+        record = _json.dumps({"k": name, "v": response})
+        self._file.write(record + b"\n")
+
+        self.index[name] = (offset, len(record))
+        self.discarded.discard(name)
+        self._dirty = True
+
+    def discard(
+            self,
+            names: Iterable[str]
+    ) -> None:
+        """
+        Drops the given names from the index, so they count as not analyzed until a new response is stored.
+        The index is written right away, so the discard survives a crash before `close()`.
+
+        Args:
+            - names (Iterable[str]): File names whose stored responses are out of date.
+        """
+        for name in names:
+            self.index.pop(name, None)
+            self.discarded.add(name)
+
+        self._dirty = True
+        self._write_index()
+
+    def get(
+            self,
+            name: str
+    ) -> Dict[str, Any]:
+        """
+        Reads a single response back without loading the other records.
+
+        Args:
+            - name (str): File name of the response.
+
+        Returns:
+            - response (Dict[str, Any]): The stored AWS Comprehend Medical API response.
+        """
+        position = self.index[name]
+
+        ## === Older records that only exist in the JSON snapshot ===
+        if position is None:
+            if self._snapshot is None:
+                self._snapshot = open_file(self.file_path)
+            return self._snapshot[name]
+
+        if self._file is not None:
+            self._file.flush()
+
+        offset, length = position
+        with open(self.data_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+                return _json.loads(mm[offset:offset + length])["v"]
+
+    def _write_index(self) -> None:
+        """
+        Atomically writes the index, with the sidecar size it covers and the discarded names.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+        saved = {
+            "sidecar_size": self.data_path.stat().st_size if self.data_path.exists() else 0,
+            "records": self.index,
+            "discarded": sorted(self.discarded)
+        }
+        tmp_path: Path = self.idx_path.with_suffix(".idx.tmp")
+        tmp_path.write_bytes(_json.dumps(saved))
+        os.replace(tmp_path, self.idx_path)
+        self._dirty = False
+
+    def close(self) -> None:
+        """
+        Closes the append handle and atomically writes the index if it changed.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if self._dirty:
+            self._write_index()
@@ -1,17 +1,29 @@
 # === Python Modules ===
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
 import ast
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Iterator, Tuple
 
+## === Hive style `FileName=<name>` partitioning of the summaries dataset ===
+SUMMARY_PARTITIONING = ds.partitioning(
+    pa.schema([("FileName", pa.string())]),
+    flavor = "hive"
+)
+
+## === Arrow type of the structured `Attributes` column in the summaries dataset ===
+ATTRIBUTES_TYPE = pa.list_(
+    pa.struct([("Type", pa.string()), ("Text", pa.string())])
+)
 
 # === Function to summarize AWS Comprehend Medical attributes ===
 def summarize_attributes(attr_value):
     """
     Safely summarizes AWS Comprehend Medical attributes.
-    Works even if attr_value is list, np.ndarray, or stringified JSON.
+    Works even if attr_value is list, np.ndarray, or stringified JSON, e.g. when read back from a CSV.
     """
     if attr_value is None:
         return None
@@ -43,22 +55,83 @@ def summarize_attributes(attr_value):
 
     return " | ".join(parts) if parts else None
 
+# === Function to summarize the attribute list of a boto3 response ===
+def _summarize_attribute_list(attrs):
+    """
+    Joins the `Type: Text` pairs of an attribute list taken straight from a Comprehend Medical response.
+    Boto3 always returns a list here, so no string parsing is needed.
+    """
+    if not isinstance(attrs, list):
+        return None
+
+    return " | ".join(
+        f"{a['Type']}: {a['Text']}"
+        for a in attrs
+        if isinstance(a, dict) and a.get("Type") and a.get("Text")
+    ) or None
+
+# === Function to keep the attributes of each entity as typed Arrow structs ===
+def _attribute_structs(entities: List[Dict[str, Any]]) -> pa.Array:
+    """
+    Builds the `list<struct<Type, Text>>` Attributes column of the Parquet dataset, keeping the same pairs `_summarize_attribute_list` joins.
+    """
+    return pa.array(
+        [
+            [
+                {"Type": a["Type"], "Text": a["Text"]}
+                for a in (entity.get("Attributes") or [])
+                if isinstance(a, dict) and a.get("Type") and a.get("Text")
+            ]
+            for entity in entities
+        ],
+        type = ATTRIBUTES_TYPE
+    )
+
+# === Generator over the processed Comprehend Medical output ===
+def iter_processed(
+        comprehend_data: Dict[str, Any]
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Lazily converts each Comprehend Medical response into a summarized DataFrame.
+
+    Args:
+        - comprehend_data (Dict[str, Any]): Dictionary of Comprehend responses.
+
+    Yields:
+        - Tuple[str, pd.DataFrame]: The file name and its summarized DataFrame.
+    """
+    for file_name, response in comprehend_data.items():
+        entities = response.get("Entities", [])
+
+        ## === Build the whole frame at once, then summarize the attributes column ===
+        df = pd.json_normalize(
+            entities,
+            max_level = 0
+        ).reindex(columns = ["Text", "Category", "Type", "Score", "Attributes"])
+        df["Attributes"] = df["Attributes"].map(_summarize_attribute_list)
+
+        yield file_name, df
+
 # === Function to process and save AWS Medical Comprehend output ===
 def process_comprehend_results(
         comprehend_data: Dict[str, Any],
-        save_data: bool = False
+        save_data: bool = False,
+        materialize: bool = True
 ) -> Dict[str, pd.DataFrame]:
     """
     Converts raw Comprehend Medical output into Pandas DataFrames
     with summarized attributes, grouped by file name.
-    Optionally saves each processed DataFrame as a CSV file.
+    Optionally saves each processed DataFrame as a CSV file, plus one
+    Parquet dataset (partitioned by file name) of all files for the search API,
+    where Attributes stay a typed `list<struct<Type, Text>>` column.
 
     Args:
         - comprehend_data (Dict[str, Any]): Dictionary of Comprehend responses.
-        - save_data (bool, optional): Whether to save output CSV files. Defaults to False.
+        - save_data (bool, optional): Whether to save output CSV and Parquet files. Defaults to False.
+        - materialize (bool, optional): Whether to keep every DataFrame in the returned dict. Pass False when only the saved files are needed, so each frame is freed once written. Defaults to True.
 
     Returns:
-        - Dict[str, pd.DataFrame]: Dictionary where keys are file names and values are summarized DataFrames.
+        - Dict[str, pd.DataFrame]: Dictionary where keys are file names and values are summarized DataFrames (empty if `materialize` is False).
     """
     if not comprehend_data:
         print("No Comprehend Medical data available.")
@@ -66,6 +139,7 @@ def process_comprehend_results(
 
     results: Dict[str, pd.DataFrame] = {}
     save_path = Path("data/processed_medical_data")
+    dataset_path = save_path / "all_summaries"
 
     ## === Create folder if saving is enabled ===
     if save_data:
@@ -75,24 +149,9 @@ def process_comprehend_results(
         )
 
     ## === Loop through each file ===
-    for file_name, response in comprehend_data.items():
-        entities = response.get("Entities", [])
-        rows = []
-
-        for ent in entities:
-            rows.append({
-                "Text": ent.get("Text"),
-                "Category": ent.get("Category"),
-                "Type": ent.get("Type"),
-                "Score": ent.get("Score"),
-                "Attributes": summarize_attributes(ent.get("Attributes"))
-            })
-
-        df = pd.DataFrame(rows)
-        results[file_name] = df
-
-        ## === Save to CSV if enabled ===
+    for file_name, df in iter_processed(comprehend_data):
         if save_data:
+            ## === Save to CSV ===
             csv_path = save_path / f"{file_name}_summary.csv"
             df.to_csv(
                 csv_path,
@@ -100,6 +159,29 @@ def process_comprehend_results(
             )
             print(f"💾 Saved: {csv_path}")
 
+            ## === Write this file's partition of the Parquet dataset used by the search API (structured Attributes) ===
+            table = pa.Table.from_pandas(df.assign(FileName = file_name), preserve_index = False)
+            table = table.set_column(
+                table.schema.get_field_index("Attributes"),
+                pa.field("Attributes", ATTRIBUTES_TYPE),
+                _attribute_structs(comprehend_data[file_name].get("Entities", []))
+            )
+            ds.write_dataset(
+                table,
+                dataset_path,
+                format = "parquet",
+                partitioning = SUMMARY_PARTITIONING,
+                basename_template = "part-{i}.parquet",
+                file_options = ds.ParquetFileFormat().make_write_options(compression = "snappy"),
+                existing_data_behavior = "overwrite_or_ignore"
+            )
+
         print(f"Processed {file_name}: {len(df)} entities")
 
-    return results
\ No newline at end of file
+        if materialize:
+            results[file_name] = df
+
+    if save_data:
+        print(f"💾 Saved: {dataset_path}")
+
+    return results
@@ -22,4 +22,4 @@ def main():
         return data
     
     except Exception as e:
-        ValueError(f"Error running the summarizer pipeline: {e}")
\ No newline at end of file
+        raise ValueError(f"Error running the summarizer pipeline: {e}") from e
\ No newline at end of file
@@ -1,47 +1,139 @@
 # === Python Modules ===
 import os
-import json
+import asyncio
+import hashlib
+import tempfile
+import httpx
 from langchain_openai import ChatOpenAI
+from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 from typing import Dict, List
 from pathlib import Path
 
+# === Utils ===
+from Task1.utils import _json
+
 # === Schema ===
 from Task2.schema.schema import (
     MedicalNotes
 )
 
-# === Function to create summaries using LangChain ===
-def get_structured_summaries(
+## === Load environment variables once (OPENAI_API_KEY is read by ChatOpenAI) ===
+load_dotenv()
+
+## === Model used for the structured summaries (part of the cache key) ===
+SUMMARY_MODEL: str = "gpt-4o-mini"
+
+## === Content-addressed cache of structured summaries, keyed by the hash of the model + prompt ===
+CACHE_DIR = Path("data/.summary_cache")
+
+## === Summarization prompt, parsed once and formatted per note ===
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    """
+    You are a careful medical summarizer. The clinical note below may contain:
+    - Duplicated information,
+    - OCR noise,
+    - Spelling/typographical variants (e.g., "Merpes" -> "Herpes").
+
+    Instructions:
+    - Think carefully before answering.
+    - Deduplicate repeated facts; state each fact once.
+    - Correct obvious, unambiguous medical spelling errors.
+    - Normalize units and medication names when clear (e.g., mg, %, °F/°C).
+    - If conflicting values appear, choose the most consistent/specific one; if uncertain, choose the most reasonable and concise phrasing.
+    - Output must strictly follow the structure: patient, diagnosis, treatment, follow_up.
+    - Do not add extra keys or commentary.
+
+    Clinical Note:
+    {summary_text}
+    """
+)
+
+## === Connection pool of the HTTP client opened for each summarization run ===
+HTTP_LIMITS = httpx.Limits(
+    max_connections = 64,
+    max_keepalive_connections = 32
+)
+
+# === Function to build the structured-output summary model ===
+def build_summary_model(
+        http_async_client: httpx.AsyncClient
+):
+    """
+    Builds the ChatOpenAI model with MedicalNotes structured output on the given pooled HTTP client.
+    The client belongs to one event loop, so the model is built inside each summarization run rather than at import.
+    """
+    return ChatOpenAI(
+        model = SUMMARY_MODEL,
+        temperature = 0,
+        http_async_client = http_async_client
+    ).with_structured_output(MedicalNotes)
+
+# === Function to compute the cache key of a prompt ===
+def _prompt_key(
+        prompt: str
+) -> str:
+    """
+    Returns the blake2b digest of the model name and the full prompt, so a changed note, prompt or model misses the cache.
+    """
+    return hashlib.blake2b(
+        f"{SUMMARY_MODEL}\n{prompt}".encode("utf-8"),
+        digest_size = 16
+    ).hexdigest()
+
+# === Function to write a JSON file atomically ===
+def _write_json(
+        save_path: Path,
+        data: Dict
+) -> None:
+    """
+    Writes `data` to a uniquely named temporary file and swaps it in with `os.replace`, so readers never see a partial file
+    and concurrent writers of the same path don't share a temporary file.
+    The document is serialized to UTF-8 bytes with orjson and written with a single call.
+    """
+    with tempfile.NamedTemporaryFile(
+        dir = save_path.parent,
+        suffix = ".tmp",
+        delete = False
+    ) as f:
+        f.write(_json.dumps(data, pretty = True))
+    os.replace(f.name, save_path)
+
+# === Function to create summaries using LangChain (async) ===
+async def get_structured_summaries_async(
         summaries: Dict[str, str],
         to_summarize: List[str] | None = None,
-        save_data: bool = True
+        save_data: bool = True,
+        max_concurrency: int = 20
 ) -> Dict[str, Dict]:
     """
     Takes formatted clinical notes (from prepare_note_from_csv) and generates
     structured medical summaries using LangChain + OpenAI with Pydantic validation.
     Processes only the files specified in 'to_summarize' and saves a new JSON
-    file for each generated structured summary.
+    file for each generated structured summary. Every file is summarized by its own
+    coroutine and up to `max_concurrency` LLM calls overlap. Outputs are cached under
+    'data/.summary_cache' by prompt hash, so unchanged notes never call the LLM again.
 
     Args:
         - summaries (Dict[str, str]): Dictionary where keys are file names and values are formatted clinical notes.
         - to_summarize (List[str] | None, optional): List of file names to process. If None, all files from summaries will be processed.
         - save_data (bool, optional): Whether to save generated structured summaries as JSON files. Defaults to True.
+        - max_concurrency (int, optional): Maximum number of LLM calls in flight at once. Defaults to 20.
 
     Returns:
         - Dict[str, Dict]: Dictionary where keys are file names and values are structured JSON outputs validated by the MedicalNotes schema.
     """
     try:
-        ## === Load environment variables ===
-        load_dotenv()
-        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
         ## === Directory path for structured outputs ===
         save_dir = Path("data/structured_json")
         os.makedirs(
             save_dir,
             exist_ok = True
         )
+        os.makedirs(
+            CACHE_DIR,
+            exist_ok = True
+        )
 
         ## === Filter summaries for only the required files ===
         if to_summarize:
@@ -57,72 +149,92 @@ def get_structured_summaries(
             print("No new files to summarize.")
             return {}
 
-        ## === Initialize model with structured output ===
-        model = ChatOpenAI(
-            model = "gpt-4o-mini",
-            temperature = 0
-        ).with_structured_output(MedicalNotes)
+        ## === Caps the LLM calls in flight to stay under the OpenAI rate limits ===
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _summarize_one(
+                file_name: str,
+                summary_text: str
+        ) -> Dict:
+            ## === Serve unchanged notes from the cache, only send the rest to the LLM ===
+            prompt = SUMMARY_PROMPT.format(summary_text = summary_text)
+            cache_path = CACHE_DIR / f"{_prompt_key(prompt)}.json"
+
+            if cache_path.exists():
+                structured_output = _json.loads(cache_path.read_bytes())
+                print(f"Cache hit: {file_name}")
+
+            else:
+                print(f"Generating structured summary for: {file_name}")
+                async with semaphore:
+                    response = await model.ainvoke(prompt)
+
+                ## === Convert Pydantic object to dictionary and cache it ===
+                structured_output = response.model_dump()
+                await asyncio.to_thread(_write_json, cache_path, structured_output)
+
+            ## === Save individual JSON file for each summary ===
+            if save_data:
+                save_path = save_dir / f"{Path(file_name).stem}.json"
+                await asyncio.to_thread(_write_json, save_path, structured_output)
+                print(f"Saved structured summary: {save_path.name}")
+
+            print(f"Completed: {file_name}")
+            return structured_output
+
+        ## === Summarize every file concurrently on one pooled HTTP client, opened and closed on this run's event loop ===
+        async with httpx.AsyncClient(limits = HTTP_LIMITS, timeout = 60) as http_async_client:
+            model = build_summary_model(http_async_client)
+            outputs = await asyncio.gather(
+                *(
+                    _summarize_one(file_name, summary_text)
+                    for file_name, summary_text in filtered_summaries.items()
+                ),
+                return_exceptions = True
+            )
 
         ## === Initialize dictionary to store structured results ===
         structured_dict: Dict[str, Dict] = {}
-
-        ## === Loop through each file and generate structured summary ===
-        for file_name, summary_text in filtered_summaries.items():
-            print(f"Generating structured summary for: {file_name}")
-
-            try:
-                response = model.invoke(
-                    f"""
-                    You are a careful medical summarizer. The clinical note below may contain:
-                    - Duplicated information,
-                    - OCR noise,
-                    - Spelling/typographical variants (e.g., "Merpes" -> "Herpes").
-
-                    Instructions:
-                    - Think carefully before answering.
-                    - Deduplicate repeated facts; state each fact once.
-                    - Correct obvious, unambiguous medical spelling errors.
-                    - Normalize units and medication names when clear (e.g., mg, %, °F/°C).
-                    - If conflicting values appear, choose the most consistent/specific one; if uncertain, choose the most reasonable and concise phrasing.
-                    - Output must strictly follow the structure: patient, diagnosis, treatment, follow_up.
-                    - Do not add extra keys or commentary.
-
-                    Clinical Note:
-                    {summary_text}
-                    """
-                )
-
-                ## === Convert Pydantic object to dictionary ===
-                structured_output = response.dict()
-                structured_dict[file_name] = structured_output
-
-                ## === Save individual JSON file for each summary ===
-                if save_data:
-                    file_stem = Path(file_name).stem
-                    save_path = save_dir / f"{file_stem}.json"
-                    with open(
-                        save_path,
-                        "w",
-                        encoding = "utf-8"
-                    ) as f:
-                        json.dump(
-                            structured_output,
-                            f,
-                            indent = 4,
-                            ensure_ascii = False
-                        )
-                    print(f"Saved structured summary: {save_path.name}")
-
-                print(f"Completed: {file_name}")
-
-            except Exception as inner_error:
-                print(f"Error processing {file_name}: {inner_error}")
+        for file_name, structured_output in zip(filtered_summaries, outputs):
+            if isinstance(structured_output, Exception):
+                print(f"Error processing {file_name}: {structured_output}")
                 continue
 
+            structured_dict[file_name] = structured_output
+
         ## === Return dictionary of structured outputs ===
         print("All structured summaries generated successfully.")
         return structured_dict
 
     except Exception as e:
         print(f"Error during structured summary generation: {e}")
-        return {}
\ No newline at end of file
+        return {}
+
+# === Function to create summaries using LangChain ===
+def get_structured_summaries(
+        summaries: Dict[str, str],
+        to_summarize: List[str] | None = None,
+        save_data: bool = True,
+        max_concurrency: int = 20
+) -> Dict[str, Dict]:
+    """
+    Synchronous entry point for `get_structured_summaries_async`, runs it on a fresh event loop.
+    Call the async version directly from code that already runs inside an event loop.
+
+    Args:
+        - summaries (Dict[str, str]): Dictionary where keys are file names and values are formatted clinical notes.
+        - to_summarize (List[str] | None, optional): List of file names to process. If None, all files from summaries will be processed.
+        - save_data (bool, optional): Whether to save generated structured summaries as JSON files. Defaults to True.
+        - max_concurrency (int, optional): Maximum number of LLM calls in flight at once. Defaults to 20.
+
+    Returns:
+        - Dict[str, Dict]: Dictionary where keys are file names and values are structured JSON outputs validated by the MedicalNotes schema.
+    """
+    return asyncio.run(
+        get_structured_summaries_async(
+            summaries = summaries,
+            to_summarize = to_summarize,
+            save_data = save_data,
+            max_concurrency = max_concurrency
+        )
+    )
@@ -1,7 +1,8 @@
 # === Python Modules ===
 import os
-from typing import Dict
+from typing import Dict, List
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # === Agent ===
 from Task2.model.agent import (
@@ -10,6 +11,7 @@ from Task2.model.agent import (
 
 # === Utils ===
 from Task2.utils.common import (
+    JSON_PATTERN,
     summarize,
     check_existing_summaries
 )
@@ -18,6 +20,38 @@ from Task1.utils.common import (
     open_file
 )
 
+# === Function to load many structured JSON files concurrently ===
+def load_structured_files(
+        file_paths: List[Path]
+) -> Dict[str, Dict]:
+    """
+    Loads the given structured summary files on a thread pool (the reads are I/O bound and release the GIL).
+    Files that fail to load are reported and skipped.
+
+    Args:
+        - file_paths (List[Path]): Structured JSON files to load.
+
+    Returns:
+        - Dict[str, Dict]: Dictionary where keys are file names and values are the loaded summaries.
+    """
+    data_dict: Dict[str, Dict] = {}
+    if not file_paths:
+        return data_dict
+
+    def _load(file_path: Path):
+        try:
+            return open_file(file_path)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers = min(32, len(file_paths))) as executor:
+        for file_path, data in zip(file_paths, executor.map(_load, file_paths)):
+            if isinstance(data, Exception):
+                print(f"Error reading file {file_path.name}: {data}")
+                continue
+            data_dict[file_path.name] = data
+
+    return data_dict
 
 # === Main Summarizer Pipeline ===
 class SummarizerPipeline:
@@ -34,6 +68,30 @@ class SummarizerPipeline:
         ## === Default directory path for processed data ===
         self.data_path: Path = data_path
 
+    def _load_all_structured(
+            self,
+            loaded: Dict[str, Dict] | None = None
+    ) -> Dict[str, Dict]:
+        """
+        Lists the structured JSON files in one `os.scandir` pass and loads them concurrently.
+
+        Args:
+            - loaded (Dict[str, Dict] | None, optional): Summaries already in memory, keyed by file name. These are not read from disk again.
+
+        Returns:
+            - Dict[str, Dict]: `loaded` merged with every other structured summary on disk.
+        """
+        data_dict: Dict[str, Dict] = dict(loaded or {})
+
+        with os.scandir(self.data_path) as entries:
+            file_paths: List[Path] = [
+                Path(entry.path) for entry in entries
+                if entry.name not in data_dict and JSON_PATTERN.search(entry.name)
+            ]
+
+        data_dict.update(load_structured_files(file_paths))
+        return data_dict
+
     def summarize_data(
             self
     ) -> Dict[str, Dict]:
@@ -52,48 +110,38 @@ class SummarizerPipeline:
         if not flag_dict.get("to_summarize", []):
             print("No new summaries to process.")
 
-            ## === Initialize an empty dictionary for existing data ===
-            data_dict: Dict[str, Dict] = {}
-
-            ## === Loop through all existing structured files ===
-            for file_name in os.listdir(self.data_path):
-                file_path = self.data_path / file_name
-
-                ## === Process only JSON files ===
-                if file_path.suffix.lower() == ".json":
-                    try:
-                        data = open_file(file_path)
-                        data_dict[file_name] = data
-                    except Exception as e:
-                        print(f"Error reading file {file_name}: {e}")
-                        continue
-            return data_dict
+            ## === Load all existing structured JSON files ===
+            return self._load_all_structured()
 
         try:
             ## === Converting each CSV file into formatted text for the LLM ===
-            summaries_dict: Dict[str, str] = summarize(data_path = self.data_path)
-
-            ## === Generating structured summaries for each formatted note ===
-            _ = get_structured_summaries(
-                summaries = summaries_dict
+            summaries_dict: Dict[str, str] = summarize()
+
+            ## === Notes without a structured summary (pending CSVs that failed to parse have no note) ===
+            pending_stems = set(flag_dict["to_summarize"])
+            pending_files: List[str] = [
+                file_name for file_name in summaries_dict
+                if Path(file_name).stem in pending_stems
+            ]
+
+            ## === An empty list would make the agent summarize every note, so stop here instead ===
+            if not pending_files:
+                print("No pending notes could be prepared for summarization.")
+                return self._load_all_structured()
+
+            ## === Generating structured summaries only for the notes without one ===
+            generated: Dict[str, Dict] = get_structured_summaries(
+                summaries = summaries_dict,
+                to_summarize = pending_files
             )
 
-            ## === Initialising an empty Dictionary ===
-            data_dict: Dict[str, Dict] = {}
-
-            ## === Loop through all existing structured files ===
-            for file_name in os.listdir(self.data_path):
-                file_path = self.data_path / file_name
-
-                ## === Process only JSON files ===
-                if file_path.suffix.lower() == ".json":
-                    try:
-                        data = open_file(file_path)
-                        data_dict[file_name] = data
-                    except Exception as e:
-                        print(f"Error reading file {file_name}: {e}")
-                        continue
-            return data_dict
+            ## === Use the summaries just generated directly (keyed by their saved JSON file name), read only the others ===
+            return self._load_all_structured(
+                loaded = {
+                    f"{Path(file_name).stem}.json": structured_output
+                    for file_name, structured_output in generated.items()
+                }
+            )
 
         except Exception as e:
             raise ValueError(f"Error summarizing files: {e}")
\ No newline at end of file
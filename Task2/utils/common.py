@@ -1,9 +1,25 @@
 # === Python Modules ===
 import os
+import re
+import hashlib
+import tempfile
 import json
-import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
 from pathlib import Path
 from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+
+## === File name filters, compiled once (case-insensitive, no per-file `.lower()`) ===
+CSV_PATTERN = re.compile(r"\.csv\Z", re.IGNORECASE)
+JSON_PATTERN = re.compile(r"\.json\Z", re.IGNORECASE)
+
+## === Columns of the Medical Comprehend CSV that end up in the note ===
+NOTE_COLUMNS = ["Text", "Category", "Type", "Attributes"]
+
+## === Formatted notes cached by (path, mtime, size) of their CSV ===
+NOTE_CACHE_DIR = Path("data/.note_cache")
 
 # === Function to convert csv file to strings ===
 def prepare_note_from_csv(
@@ -18,41 +34,78 @@ def prepare_note_from_csv(
     Returns:
         - str: Formatted text combining all entities from the CSV.
     """
-    # === Load CSV file ===
-    df = pd.read_csv(csv_path)
-
-    # === List to store formatted lines ===
-    formatted_lines = []
+    # === Load only the columns used in the note, as strings (multithreaded C parser, missing columns come back empty) ===
+    df = pv.read_csv(
+        csv_path,
+        convert_options = pv.ConvertOptions(
+            include_columns = NOTE_COLUMNS,
+            include_missing_columns = True,
+            column_types = dict.fromkeys(NOTE_COLUMNS, pa.string()),
+            strings_can_be_null = True
+        )
+    ).to_pandas().fillna("")
+
+    # === Create a readable string for each extracted entity ===
+    lines = df["Category"].str.strip() + " (" + df["Type"].str.strip() + "): " + df["Text"].str.strip()
+
+    # === Add attributes if present (e.g., TEST_VALUE, DOSAGE, DURATION) ===
+    attributes = df["Attributes"].str.strip()
+    has_attributes = attributes.ne("") & attributes.str.lower().ne("nan")
+    lines = np.where(has_attributes, lines + " | " + attributes, lines)
 
-    # === Iterate through each row in the CSV ===
-    for _, row in df.iterrows():
-        entity_text = str(row["Text"]).strip()
-        entity_category = str(row["Category"]).strip()
-        entity_type = str(row["Type"]).strip()
-        entity_attributes = str(row.get("Attributes", "")).strip()
-
-        # === Create a readable string for each extracted entity ===
-        line = f"{entity_category} ({entity_type}): {entity_text}"
+    # === Combine all entity lines into a single note ===
+    return "\n".join(lines)
 
-        # === Add attributes if present (e.g., TEST_VALUE, DOSAGE, DURATION) ===
-        if entity_attributes and entity_attributes.lower() != "nan":
-            line += f" | {entity_attributes}"
+# === Function to convert a csv file to a string, reusing the note cached for an unchanged file ===
+def cached_note_from_csv(
+        csv_path: str
+) -> str:
+    """
+    Returns prepare_note_from_csv(csv_path) from the disk cache under 'data/.note_cache' when the
+    file's (path, mtime, size) is unchanged, otherwise builds the note and caches it atomically.
 
-        formatted_lines.append(line)
+    Args:
+        - csv_path (str): Path to the CSV file.
 
-    # === Combine all entity lines into a single note ===
-    return "\n".join(formatted_lines)
+    Returns:
+        - str: Formatted text combining all entities from the CSV.
+    """
+    stat = os.stat(csv_path)
+    key = f"{os.path.abspath(csv_path)}\n{stat.st_mtime_ns}\n{stat.st_size}"
+    cache_path = NOTE_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.txt"
+
+    ## === Cache hit ===
+    if cache_path.exists():
+        return cache_path.read_text(encoding = "utf-8")
+
+    ## === Build the note and swap it in, so concurrent readers never see a partial file ===
+    note_text = prepare_note_from_csv(csv_path)
+    os.makedirs(NOTE_CACHE_DIR, exist_ok = True)
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding = "utf-8",
+        dir = NOTE_CACHE_DIR,
+        suffix = ".tmp",
+        delete = False
+    ) as f:
+        f.write(note_text)
+    os.replace(f.name, cache_path)
+
+    return note_text
 
 # === Function to convert every csv into the string ===
 def summarize(
-        data_path: Path = Path("data/processed_medical_data")
+        data_path: Path = Path("data/processed_medical_data"),
+        max_workers: int | None = None
 ) -> Dict[str, str]:
     """
     Loops through all processed Medical Comprehend CSV files, converts each into
-    a formatted text note using prepare_note_from_csv(), and stores them in a dictionary.
+    a formatted text note using prepare_note_from_csv() (cached per unchanged file), and stores them in a dictionary.
+    The files are independent, so they are parsed on a thread pool (`read_csv` releases the GIL).
 
     Args:
         - data_path (Path, optional): Path to the folder containing processed CSVs. Defaults to 'data/processed_medical_data'.
+        - max_workers (int | None, optional): Number of parsing threads. Defaults to the CPU count.
 
     Returns:
         - Dict[str, str]: Dictionary where keys are CSV filenames and values are formatted clinical notes (ready for LLM summarization).
@@ -65,16 +118,32 @@ def summarize(
         if not os.path.exists(data_path):
             print(f"Provided path does not exist: {data_path}")
             return {}
-        
-        # === Loop through all files in the directory ===
-        for file_name in os.listdir(data_path):
-            file_path = os.path.join(data_path, file_name)
 
-            # Process only CSV files
-            if os.path.isfile(file_path) and file_name.lower().endswith(".csv"):
-                print(f"Reading: {file_name}")
-                note_text = prepare_note_from_csv(file_path)
-                notes_dict[file_name] = note_text
+        # === Collect all CSV files in the directory (one scandir pass, no extra stat per file) ===
+        with os.scandir(data_path) as entries:
+            csv_entries: List[os.DirEntry] = [
+                entry for entry in entries
+                if CSV_PATTERN.search(entry.name) and entry.is_file()
+            ]
+        if not csv_entries:
+            print("Processed 0 CSV files successfully.")
+            return notes_dict
+
+        def _prepare(entry: os.DirEntry):
+            try:
+                return cached_note_from_csv(entry.path)
+            except Exception as e:
+                return e
+
+        # === Parse the files concurrently, keeping per-file errors ===
+        with ThreadPoolExecutor(max_workers = min(max_workers or os.cpu_count() or 1, len(csv_entries))) as executor:
+            for entry, note_text in zip(csv_entries, executor.map(_prepare, csv_entries)):
+                if isinstance(note_text, Exception):
+                    print(f"Error reading {entry.name}: {note_text}")
+                    continue
+
+                print(f"Reading: {entry.name}")
+                notes_dict[entry.name] = note_text
 
         # === Return all generated notes ===
         print(f"Processed {len(notes_dict)} CSV files successfully.")
@@ -112,29 +181,23 @@ def check_existing_summaries(
         if not structured_data_path.exists():
             os.makedirs(structured_data_path, exist_ok=True)
 
-        ## === Get all available processed CSV files ===
-        all_files = [
-            f for f in os.listdir(note_data_path)
-            if f.lower().endswith(".csv")
-        ]
+        ## === Stems of all available processed CSV files ===
+        with os.scandir(note_data_path) as entries:
+            csv_stems = {
+                Path(entry.name).stem for entry in entries
+                if CSV_PATTERN.search(entry.name) and entry.is_file()
+            }
 
-        ## === Get all structured summary files (if any) ===
-        existing_summaries = [
-            f.replace("_structured.json", "")
-            for f in os.listdir(structured_data_path)
-            if f.lower().endswith(".json")
-        ]
+        ## === Stems of all structured summary files (saved as '<csv stem>.json') ===
+        with os.scandir(structured_data_path) as entries:
+            summarized_stems = {
+                Path(entry.name).stem for entry in entries
+                if JSON_PATTERN.search(entry.name) and entry.is_file()
+            }
 
         ## === Compare file names (without extensions) ===
-        csv_stems = [Path(f).stem for f in all_files]
-        summarized_stems = set(existing_summaries)
-
-        to_summarize = [
-            f for f in csv_stems if f not in summarized_stems
-        ]
-        already_summarized = [
-            f for f in csv_stems if f in summarized_stems
-        ]
+        to_summarize = sorted(csv_stems - summarized_stems)
+        already_summarized = sorted(csv_stems & summarized_stems)
 
         ## === Return comparison results ===
         return {
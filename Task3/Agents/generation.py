@@ -1,6 +1,8 @@
 # === Python Modules ===
+from functools import lru_cache
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.prompts import PromptTemplate
 
 # === Agent State ===
 from Task3.agent_state import AgentState
@@ -9,23 +11,11 @@ from Task3.agent_state import AgentState
 from Task3.schema.schemas import AnswerGeneration
 
 # === Utils ===
-from Task3.utils import update_recent_chats
+from Task3.utils import update_recent_chats, get_http_async_client
 
-# === Answer Generation Agent ===
-async def answer_generation(
-        state: AgentState
-) -> AgentState:
-    """
-    Generates the final answer based on the rephrased question and relevant documents.
-
-    Args:
-        state (AgentState): The current state of the agent containing the rephrased question and documents.
-
-    Returns:
-        AgentState: The updated state with the generated answer.
+## === Answer prompt, parsed once and formatted per question ===
+ANSWER_PROMPT = PromptTemplate.from_template(
     """
-    ## === Render Prompt ===
-    prompt = """
     ROLE
         - You are an expert AI answer generator for a medical Retrieval-Augmented Generation system.
         - Your job is to create accurate, clear, and context-grounded answers based on retrieved documents.
@@ -44,16 +34,43 @@ async def answer_generation(
 
     RELEVANT DOCUMENTS:
     {documents}
-    """.format(
+    """
+)
+
+# === Function to build the structured-output model once ===
+@lru_cache(maxsize = None)
+def get_answer_model():
+    """
+    Builds the ChatOpenAI model with AnswerGeneration structured output, shared by every answer.
+    Built lazily on first use, so importing this module doesn't need OPENAI_API_KEY.
+    """
+    return ChatOpenAI(
+        model_name = "gpt-4o-mini",
+        temperature = 0.0,
+        http_async_client = get_http_async_client()
+    ).with_structured_output(AnswerGeneration)
+
+# === Answer Generation Agent ===
+async def answer_generation(
+        state: AgentState
+) -> AgentState:
+    """
+    Generates the final answer based on the rephrased question and relevant documents.
+
+    Args:
+        state (AgentState): The current state of the agent containing the rephrased question and documents.
+
+    Returns:
+        AgentState: The updated state with the generated answer.
+    """
+    ## === Render Prompt ===
+    prompt = ANSWER_PROMPT.format(
         user_query = state.get("rephrased_question"),
         documents = state.get("documents")
     )
 
-    # === Initialize Language Model ===
-    llm = ChatOpenAI(
-        model_name = "gpt-4o-mini",
-        temperature = 0.0
-    ).with_structured_output(AnswerGeneration)
+    # === Language Model (built once per process) ===
+    llm = get_answer_model()
 
     message = [
         SystemMessage(content = prompt),
@@ -64,12 +81,13 @@ async def answer_generation(
         message
     )
 
-    ## === Outputs ===
-    state["generated_answer"] = response.answer
+    ## === Outputs (the answer is trimmed once here, and stored as is in the history) ===
+    answer = response.answer.strip()
+    state["generated_answer"] = answer
     state["conversation"] = update_recent_chats(
-        recent_chats = state.get("messages", []),
+        recent_chats = state.get("conversation"),
         latest_question = state.get("rephrased_question"),
-        answer = response.answer
+        answer = answer
     )
 
     return state
\ No newline at end of file
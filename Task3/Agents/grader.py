@@ -1,6 +1,12 @@
 # === Python Modules ===
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.prompts import PromptTemplate
 
 # === Agent State ===
 from Task3.agent_state import AgentState
@@ -8,12 +14,81 @@ from Task3.agent_state import AgentState
 # === Schema ===
 from Task3.schema.schemas import DocGrader
 
+# === Utils ===
+from Task3.utils import get_http_async_client
+
+## === Grading prompt, parsed once and formatted per batch of documents ===
+GRADER_PROMPT = PromptTemplate.from_template(
+    """
+    Evaluate whether each retrieved document is relevant to the user's question.
+    The grader determines if a document helps answer the question or not.
+
+    ROLE
+        - You are a retrieval grader that assesses the relevance of documents to a user's question.
+
+    INPUTS
+        - "question": The user's query.
+        - "documents": The retrieved documents, numbered from DOC 0.
+
+    TASK
+        - For every document, determine if it contains information that directly answers or helps answer the question.
+
+    RULES
+        - Return exactly {count} scores, one per document, in document order.
+        - If a document is relevant, its score is **"Yes"**.
+        - If not, its score is **"No"**.
+        - Do not include any explanations or reasoning.
+
+    USER QUESTION:
+        {question}
+
+    DOCUMENTS:
+    {documents}
+    """
+)
+
+# === Function to build the structured-output model once ===
+@lru_cache(maxsize = None)
+def get_grader_model():
+    """
+    Builds the ChatOpenAI model with DocGrader structured output, shared by every grading call.
+    Built lazily on first use, so importing this module doesn't need OPENAI_API_KEY.
+    """
+    return ChatOpenAI(
+        model = "gpt-4o-mini",
+        temperature = 0.0,
+        http_async_client = get_http_async_client()
+    ).with_structured_output(DocGrader)
+
+## === Documents graded per LLM call, and grading calls in flight at the same time ===
+GRADE_BATCH_SIZE = 8
+MAX_CONCURRENT_GRADES = 8
+
+## === Process-wide LRU of verdicts, keyed by the hash of (normalized question, document content) ===
+GRADE_CACHE_SIZE = 10_000
+_grade_cache: "OrderedDict[str, bool]" = OrderedDict()
+
+# === Function to compute the verdict cache key ===
+def _grade_key(
+        question: str | None,
+        document: Any
+) -> str:
+    """
+    Returns the sha256 of the lower-cased, stripped question and the document content.
+    """
+    content = getattr(document, "page_content", document)
+    return hashlib.sha256(
+        f"{(question or '').lower().strip()}||{content}".encode("utf-8")
+    ).hexdigest()
+
 # === Main Agent Body ===
 async def doc_grader(
         state: AgentState
 ) -> AgentState:
     """
     Grades the relevance of retrieved documents to the user's query.
+    Documents without a cached verdict are graded in batches of `GRADE_BATCH_SIZE` per LLM call,
+    and the batches are sent concurrently.
 
     Args:
         state (AgentState): The current state of the agent, including the user's question and retrieved documents.
@@ -21,59 +96,68 @@ async def doc_grader(
     Returns:
         AgentState: The updated state with graded documents.
     """
-    relavant_docs: list = []
-    for document in state.get("documents"):
+    question = state.get("rephrased_question")
+    documents: list = state.get("documents") or []
+
+    ## === Reuse the verdicts of pairs that were already graded, collect the rest ===
+    keys: List[str] = [_grade_key(question, document) for document in documents]
+    verdicts: Dict[str, bool] = {}
+    pending: Dict[str, Any] = {}
+    for key, document in zip(keys, documents):
+        if key in _grade_cache:
+            _grade_cache.move_to_end(key)
+            verdicts[key] = _grade_cache[key]
+        else:
+            pending.setdefault(key, document)
+
+    ## === Caps the grading calls in flight to stay under the OpenAI rate limits ===
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_GRADES)
+
+    async def grade_batch(batch: List[Tuple[str, Any]]) -> None:
         ## === Prompt ===
-        prompt = """
-        Evaluate whether a retrieved document is relevant to the user's question.
-        The grader determines if the document helps answer the question or not.
-
-        ROLE
-            - You are a retrieval grader that assesses the relevance of a document to a user's question.
-
-        INPUTS
-            - "question": The user's query.
-            - "document": The retrieved document content.
-
-        TASK
-            - Determine if the document contains information that directly answers or helps answer the question.
-
-        RULES
-            - If the document is relevant, respond **"Yes"**.
-            - If not, respond **"No"**.
-            - Respond with exactly one word: **"Yes"** or **"No"**.
-            - Do not include any explanations or reasoning.
-
-        USER QUESTION:
-            {question}
-
-        DOCUMENT CONTENT:
-            {document}
-        """.format(
-            question = state.get("rephrased_question"),
-            document = document
+        prompt = GRADER_PROMPT.format(
+            count = len(batch),
+            question = question,
+            documents = "\n".join(
+                f"DOC {i}: {document}" for i, (_, document) in enumerate(batch)
+            )
         )
 
-        ## === LLM ===
-        llm = ChatOpenAI(
-            model = "gpt-4o-mini",
-            temperature = 0.0
-        ).with_structured_output(DocGrader)
-
         messages = [
             SystemMessage(content = prompt),
             HumanMessage(content = "Return the result strictly following the JSON schema.")
         ]
 
-        response = await llm.ainvoke(
-            messages
+        ## === LLM (built once per process and shared by every grading call) ===
+        async with semaphore:
+            response = await get_grader_model().ainvoke(
+                messages
+            )
+
+        ## === Missing scores (response shorter than the batch) count as "No" ===
+        scores = list(response.scores)[:len(batch)]
+        scores += ["No"] * (len(batch) - len(scores))
+
+        for (key, _), score in zip(batch, scores):
+            verdicts[key] = score.strip().lower() == "yes"
+
+            ## === Store the verdict, evicting the least recently used one when full ===
+            _grade_cache[key] = verdicts[key]
+            if len(_grade_cache) > GRADE_CACHE_SIZE:
+                _grade_cache.popitem(last = False)
+
+    ## === Grade the remaining documents in concurrent batches ===
+    pending_items = list(pending.items())
+    await asyncio.gather(
+        *(
+            grade_batch(pending_items[i:i + GRADE_BATCH_SIZE])
+            for i in range(0, len(pending_items), GRADE_BATCH_SIZE)
         )
+    )
+    relavant_docs: list = [document for key, document in zip(keys, documents) if verdicts[key]]
 
-        if response.score.strip().lower() == "yes":
-            relavant_docs.append(document)
-    
     ## === Output ===
     state["documents"] = relavant_docs
     state["proceed_to_generate"] = len(relavant_docs) > 0
 
-    return state
\ No newline at end of file
+    return state
@@ -1,5 +1,4 @@
 # === Agent State ===
-import asyncio
 from Task3.agent_state import AgentState
 
 # === Main Retriever Agent ===
@@ -21,8 +20,9 @@ async def doc_retriever(
     query = state.get("rephrased_question", "")
 
     # === Retrieving documents ===
-    documents = await asyncio.to_thread(retriever.invoke, query)
+    documents = await retriever.ainvoke(query)
 
-    state["documents"] = documents
+    ## === Keep only the page text, the state is checkpointed after every node ===
+    state["documents"] = [document.page_content for document in documents]
 
     return state
\ No newline at end of file
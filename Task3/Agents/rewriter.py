@@ -1,6 +1,9 @@
 # === Python Modules ===
+from collections import deque
+from functools import lru_cache
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.prompts import PromptTemplate
 
 # === Agent State ===
 from Task3.agent_state import AgentState
@@ -8,6 +11,47 @@ from Task3.agent_state import AgentState
 # === Schema ===
 from Task3.schema.schemas import QueryRewrite
 
+# === Utils ===
+from Task3.utils import format_recent_chats, get_http_async_client
+
+## === Rewriter prompt, parsed once and formatted per question ===
+REWRITER_PROMPT = PromptTemplate.from_template(
+    """
+    You are an intelligent query interpreter for a medical retrieval augmented system.
+    Your job is to:
+        1. Analyze the user question.
+        2. Decide if the query needs to use code:
+            - "tool" -> if the question needs filtering, counting, comparison, or listing  (e.g. "which patients", "how many", "most frequent", "list all", "find who")
+        3. Rewrite the question in a clear and specific way for downstream nodes.
+            - Expand pronouns or vague references using memory if provided.
+            - Keep the meaning identical.
+
+    You will be given:
+        - The user's question
+        - Optional memory context from the last few chats.
+    ---
+
+    Memory Context:
+    {memory_context}
+
+    User Question:
+    {user_query}
+    """
+)
+
+# === Function to build the structured-output model once ===
+@lru_cache(maxsize = None)
+def get_rewriter_model():
+    """
+    Builds the ChatOpenAI model with QueryRewrite structured output, shared by every rewrite.
+    Built lazily on first use, so importing this module doesn't need OPENAI_API_KEY.
+    """
+    return ChatOpenAI(
+        model = "gpt-4o-mini",
+        temperature = 0,
+        http_async_client = get_http_async_client()
+    ).with_structured_output(QueryRewrite)
+
 
 # === Main Agent Body ===
 async def query_rewriter(
@@ -22,7 +66,7 @@ async def query_rewriter(
 
     ## === Conversation ===
     if "conversation" not in state:
-        state["conversation"] = {}
+        state["conversation"] = deque(maxlen = 3)
 
     ## === Tool Flag ===
     state["tool_flag"] = False
@@ -31,36 +75,13 @@ async def query_rewriter(
     state["generated_answer"] = None
 
     ## === Prompt ===
-    prompt = """
-    You are an intelligent query interpreter for a medical retrieval augmented system.
-    Your job is to:
-        1. Analyze the user question.
-        2. Decide if the query needs to use code:
-            - "tool" -> if the question needs filtering, counting, comparison, or listing  (e.g. "which patients", "how many", "most frequent", "list all", "find who")
-        3. Rewrite the question in a clear and specific way for downstream nodes.
-            - Expand pronouns or vague references using memory if provided.
-            - Keep the meaning identical.
-
-    You will be given:
-        - The user's question
-        - Optional memory context from the last few chats.
-    ---
-
-    Memory Context:
-    {memory_context}
-
-    User Question:
-    {user_query}
-    """.format(
-        memory_context = state.get("conversation", {}),
+    prompt = REWRITER_PROMPT.format(
+        memory_context = format_recent_chats(state.get("conversation")),
         user_query = state.get("user_query")
     )
 
-    ## === LLM Model Call ===
-    model = ChatOpenAI(
-        model = "gpt-4o-mini",
-        temperature = 0
-    ).with_structured_output(QueryRewrite)
+    ## === LLM Model (built once per process) ===
+    model = get_rewriter_model()
 
     ## === Invoke the Model ===
     try:
@@ -69,14 +90,14 @@ async def query_rewriter(
             HumanMessage(content = "Return the result strictly following the JSON schema.")
         ])
 
-        # === Update State ===
-        state["rephrased_question"] = response.rephrased_question
+        # === Update State (trimmed once here, so later nodes and the history store it as is) ===
+        state["rephrased_question"] = response.rephrased_question.strip()
         state["tool_flag"] = response.tool_flag
 
     except Exception as e:
         print(f"Query Rewriter Error: {e}")
         # Fallback: default to RAG mode with same query
-        state["rephrased_question"] = state.get("user_query", "")
+        state["rephrased_question"] = state.get("user_query", "").strip()
         state["tool_flag"] = False
 
     ## === Return Updated State ===
@@ -1,10 +1,12 @@
 # === Python Modules ===
-from typing import TypedDict, Dict
+from typing import TypedDict, Deque, Dict, List
 
 # === Agent State ===
-class AgentState(TypedDict):
+class AgentState(TypedDict, total = False):
     """
     State of the Agent that can be passed between calls.
+    The whole state is checkpointed to MongoDB after every node, so it only holds plain, small values
+    (retrieved documents are kept as their page text, not as `Document` objects).
     """
     ## === User Query ===
     user_query: str
@@ -13,14 +15,14 @@ class AgentState(TypedDict):
     rephrased_question: str | None
 
     ## === History ===
-    conversation: Dict[int, Dict[str, str]]
+    conversation: Deque[Dict[str, str]]
 
     ## === Tool Flag ===
-    tool_flag: bool = False
+    tool_flag: bool
 
     ## === Retrieved Documents ===
-    documents: list | None
-    proceed_to_generate: bool = False
+    documents: List[str] | None
+    proceed_to_generate: bool
 
     ## === Answer Generation ===
     generated_answer: str | None
\ No newline at end of file
@@ -34,18 +34,25 @@ def main() -> None:
     if "unique_id" not in st.session_state:
         st.session_state.unique_id = str(uuid.uuid4())
 
+    # === Reuse one HTTP session (keep-alive connection to the backend) across reruns ===
+    if "http_session" not in st.session_state:
+        st.session_state.http_session = requests.Session()
+
     # === Backend Endpoint URL ===
     FASTAPI_URL = "http://127.0.0.1:8000/generate"
 
     # === Chat Display Section ===
     st.markdown("### 💬 Conversation")
 
-    # Render each message using markdown
-    for chat in st.session_state.chat_history:
-        if chat["role"] == "user":
-            st.markdown(f"**🧑‍💻 You:** {chat['content']}")
-        else:
-            st.markdown(f"**🤖 Agent:** {chat['content']}")
+    # Render the whole conversation as one markdown element
+    if st.session_state.chat_history:
+        st.markdown(
+            "\n\n".join(
+                f"**🧑‍💻 You:** {chat['content']}" if chat["role"] == "user"
+                else f"**🤖 Agent:** {chat['content']}"
+                for chat in st.session_state.chat_history
+            )
+        )
 
     # === Input Area ===
     user_input = st.chat_input("Type your message here...")
@@ -60,7 +67,7 @@ def main() -> None:
 
         try:
             # === Send Query to FastAPI Backend ===
-            response = requests.post(
+            response = st.session_state.http_session.post(
                 FASTAPI_URL,
                 json = {
                     "unique_id": st.session_state.unique_id,
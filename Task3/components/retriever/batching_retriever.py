@@ -0,0 +1,171 @@
+# === Python Modules ===
+import asyncio
+import hashlib
+import faiss
+import numpy as np
+from collections import OrderedDict
+from typing import Any, List, Tuple
+from pydantic import PrivateAttr
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.documents import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+
+
+# === Micro-batching Retriever ===
+class BatchingRetriever(BaseRetriever):
+    """
+    LangChain retriever over a loaded FAISS vector store that coalesces concurrent async queries.
+
+    Queries awaiting `ainvoke` are put on a queue. A background worker takes the first one, keeps collecting
+    for up to `max_wait` seconds (or until `max_batch` queries), embeds the whole batch in one request and
+    searches the index once with all the query vectors, then resolves each caller's future with its documents.
+
+    Results are memoized in an LRU keyed by the blake2b digest of the query text and the index `version`,
+    so a repeated query skips both the embeddings request and the search. Call `invalidate()` after the
+    index changes.
+    """
+
+    db: Any
+    k: int = 3
+    max_batch: int = 32
+    max_wait: float = 0.05
+    cache_size: int = 4096
+    version: int = 0
+
+    _queue: asyncio.Queue | None = PrivateAttr(default = None)
+    _worker: asyncio.Task | None = PrivateAttr(default = None)
+    _cache: OrderedDict = PrivateAttr(default_factory = OrderedDict)
+
+    # === Cache ===
+    def invalidate(self) -> None:
+        """
+        Bumps the index version (older cache entries can no longer match) and empties the cache.
+        """
+        self.version += 1
+        self._cache.clear()
+
+    # === Lifecycle ===
+    def start(self) -> None:
+        """
+        Starts the batching worker on the running event loop (called from the FastAPI lifespan).
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Cancels the batching worker and fails the queries still waiting in the queue.
+        """
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Retriever was stopped."))
+
+    # === Helper: Batched FAISS search ===
+    def _search(
+            self,
+            vectors: List[List[float]]
+    ) -> List[List[Document]]:
+        """
+        Searches the index once for all the query vectors and maps the hits back to documents.
+        """
+        queries = np.asarray(vectors, dtype = np.float32)
+        if self.db._normalize_L2:
+            faiss.normalize_L2(queries)
+
+        _, indices = self.db.index.search(queries, self.k)
+
+        return [
+            [
+                self.db.docstore.search(self.db.index_to_docstore_id[i])
+                for i in row if i != -1
+            ]
+            for row in indices
+        ]
+
+    # === Worker: collect a batch, embed and search it in one go ===
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+
+            ## === Keep collecting until the window closes or the batch is full ===
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            ## === One embeddings request and one index search for the whole batch ===
+            try:
+                vectors = await self.db.embeddings.aembed_documents(
+                    [query for query, _ in batch]
+                )
+                results = await asyncio.to_thread(self._search, vectors)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), documents in zip(batch, results):
+                if not future.done():
+                    future.set_result(documents)
+
+    # === LangChain retriever interface ===
+    async def _aget_relevant_documents(
+            self,
+            query: str,
+            *,
+            run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """
+        Returns the cached documents of a repeated query, otherwise queues the query for the next batch
+        and waits for its documents. Falls back to a direct search when the worker isn't running.
+        """
+        ## === Repeated query: served from the cache (only touched on the event loop thread, no lock needed) ===
+        key = (self.version, hashlib.blake2b(query.encode("utf-8"), digest_size = 16).digest())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return list(self._cache[key])
+
+        if self._worker is None:
+            documents = await self.db.asimilarity_search(query, k = self.k)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((query, future))
+            documents = await future
+
+        ## === Store the result, evicting the least recently used one when full ===
+        self._cache[key] = tuple(documents)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last = False)
+
+        return documents
+
+    def _get_relevant_documents(
+            self,
+            query: str,
+            *,
+            run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """
+        Synchronous callers search directly, without batching.
+        """
+        return self.db.similarity_search(query, k = self.k)
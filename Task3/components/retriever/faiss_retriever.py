@@ -2,11 +2,27 @@
 import os
 import re
 import json
+import faiss
+import numpy as np
 from typing import List, Dict, Any
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 
+# === Components ===
+from Task3.components.retriever.matrix_index import MatrixIndex
+
+## === HNSW graph parameters: neighbours per node, and candidates explored per query ===
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+## === Load flags: map the stored vectors/codes from the file instead of copying them into the process ===
+## === (IO_FLAG_MMAP_IFC also maps flat and scalar-quantized codes, IO_FLAG_MMAP only inverted lists) ===
+INDEX_IO_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+## === Corpora below this size are searched with an exact matrix scan instead of the HNSW graph ===
+MATRIX_MAX_DOCS = 50_000
 
 # === FAISS Retriever Class ===
 class FAISSRetriever:
@@ -21,7 +37,12 @@ class FAISSRetriever:
         embedding_model: str = "text-embedding-3-small"
     ):
         self.index_path = index_path
-        self.embeddings = OpenAIEmbeddings(model=embedding_model)
+        ## === Up to 2048 texts per embeddings request (the API maximum) instead of the default 1000 ===
+        self.embeddings = OpenAIEmbeddings(
+            model = embedding_model,
+            chunk_size = 2048,
+            max_retries = 5
+        )
         self.db = None
 
         # === Ensure directory exists ===
@@ -58,6 +79,33 @@ class FAISSRetriever:
         print(f"Created {len(documents)} Document objects with metadata.")
         return documents
 
+    # === Helper: Pick the search backend of the loaded store ===
+    def _select_backend(self) -> None:
+        """
+        Swaps the FAISS index for an exact `MatrixIndex` scan when `RETRIEVER_BACKEND` is 'matrix', or when it is
+        'auto' (the default) and the corpus has fewer than `MATRIX_MAX_DOCS` documents. Needs the `vectors.npy`
+        saved by `build_index`; otherwise (or with 'faiss') the FAISS index is kept.
+        """
+        backend = os.getenv("RETRIEVER_BACKEND", "auto").lower()
+        vectors_path = os.path.join(self.index_path, "vectors.npy")
+
+        if backend == "faiss" or not os.path.exists(vectors_path):
+            return
+        if backend == "auto" and self.db.index.ntotal >= MATRIX_MAX_DOCS:
+            return
+
+        ## === Mapped read-only: the pages are shared by every worker process instead of copied into each ===
+        self.db.index = MatrixIndex(np.load(vectors_path, mmap_mode = "r"))
+        print(f"Using the exact matrix backend for {self.db.index.ntotal} documents.")
+
+    # === Helper: Search-time settings of the loaded index ===
+    def _tune_index(self) -> None:
+        """
+        Sets the HNSW search depth (it is not persisted with the index). Flat indexes built before are left as is.
+        """
+        if hasattr(self.db.index, "hnsw"):
+            self.db.index.hnsw.efSearch = HNSW_EF_SEARCH
+
     # === Build index from Document objects ===
     def build_index(
             self, documents: List[Document]
@@ -71,14 +119,33 @@ class FAISSRetriever:
         if not documents:
             raise ValueError("No documents provided to build the index.")
 
+        # === Embed the documents once ===
+        texts = [document.page_content for document in documents]
+        vectors = self.embeddings.embed_documents(texts)
+
+        # === HNSW graph (sub-linear search) over int8 scalar-quantized vectors (4x smaller than float32) ===
+        index = faiss.IndexHNSWSQ(len(vectors[0]), faiss.ScalarQuantizer.QT_8bit, HNSW_M)
+        index.train(np.asarray(vectors, dtype = np.float32))
+
         # === Build the FAISS DB ===
-        self.db = FAISS.from_documents(
-            documents = documents,
-            embedding = self.embeddings
+        self.db = FAISS(
+            embedding_function = self.embeddings,
+            index = index,
+            docstore = InMemoryDocstore(),
+            index_to_docstore_id = {}
+        )
+        self.db.add_embeddings(
+            text_embeddings = zip(texts, vectors),
+            metadatas = [document.metadata for document in documents]
         )
+        self._tune_index()
 
-        # === Save Index ===
+        # === Save Index (and the normalized float32 vectors, which the matrix backend maps as they are) ===
         self.db.save_local(self.index_path)
+        np.save(
+            os.path.join(self.index_path, "vectors.npy"),
+            MatrixIndex(np.asarray(vectors, dtype = np.float32)).vectors
+        )
         print(f"FAISS index saved at: {os.path.abspath(self.index_path)}")
 
         # === Return retriever object ===
@@ -91,7 +158,8 @@ class FAISSRetriever:
     # === Load existing FAISS index ===
     def load_index(self) -> Any:
         """
-        Loads a previously saved FAISS index and returns a retriever.
+        Loads a previously saved FAISS index (memory-mapped, read-only) and returns a retriever.
+        The vectors stay in the page cache and are shared by every worker process that loads the same file.
         """
         if not os.path.exists(os.path.join(self.index_path, "index.faiss")):
             raise FileNotFoundError(f"No FAISS index found at {self.index_path}")
@@ -99,9 +167,13 @@ class FAISSRetriever:
         self.db = FAISS.load_local(
             folder_path = self.index_path,
             embeddings = self.embeddings,
-            allow_dangerous_deserialization = True
+            allow_dangerous_deserialization = True,
+            io_flags = INDEX_IO_FLAGS
         )
 
+        self._select_backend()
+        self._tune_index()
+
         print(f"Loaded FAISS index from {os.path.abspath(self.index_path)}")
 
         # === Return retriever ===
@@ -127,4 +199,4 @@ class FAISSRetriever:
             query,
             k = top_k
         )
-        return results
\ No newline at end of file
+        return results
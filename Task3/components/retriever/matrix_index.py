@@ -0,0 +1,99 @@
+# === Python Modules ===
+import numpy as np
+from typing import Tuple
+
+## === Optional SIMD kernels for the distance computation (falls back to a BLAS matrix product) ===
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# === Exact cosine index over an in-memory matrix ===
+class MatrixIndex:
+    """
+    Drop-in replacement for the FAISS index of a small corpus: a brute-force cosine scan over a contiguous
+    float32 matrix of L2-normalized vectors. It exposes the part of the FAISS index API the LangChain store
+    uses (`d`, `ntotal`, `search`), so it can be swapped into `FAISS.index` directly.
+
+    Distances are returned as squared L2 between unit vectors (2 - 2 * cosine), which ranks exactly like
+    the FAISS L2 index for normalized embeddings such as OpenAI's.
+    """
+
+    def __init__(
+            self,
+            vectors: np.ndarray
+    ):
+        """
+        Initializes the MatrixIndex, normalizing the vectors once. Vectors that are already contiguous
+        float32 unit vectors (e.g. a memory-mapped `.npy` written by `build_index`) are used in place, so
+        worker processes mapping the same file share its pages instead of each holding a private copy.
+
+        Args:
+            - vectors (np.ndarray): (N, D) document embeddings.
+        """
+        if not self._is_normalized(vectors):
+            vectors = self._normalize(vectors)
+
+        self.vectors: np.ndarray = vectors
+        self.ntotal, self.d = self.vectors.shape
+
+    @staticmethod
+    def _is_normalized(
+            vectors: np.ndarray
+    ) -> bool:
+        """
+        Returns True when the vectors can be searched as they are: contiguous float32 rows of unit length.
+        """
+        return (
+            vectors.dtype == np.float32
+            and vectors.flags.c_contiguous
+            and bool(np.allclose(np.linalg.norm(vectors, axis = 1), 1.0, atol = 1e-4))
+        )
+
+    @staticmethod
+    def _normalize(
+            vectors: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns a contiguous float32 copy of the vectors scaled to unit length.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype = np.float32)
+        norms = np.linalg.norm(vectors, axis = 1, keepdims = True)
+        return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+    def search(
+            self,
+            queries: np.ndarray,
+            k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k nearest vectors of every query.
+
+        Args:
+            - queries (np.ndarray): (Q, D) query embeddings.
+            - k (int): Number of neighbours per query.
+
+        Returns:
+            - Tuple[np.ndarray, np.ndarray]: (Q, k) distances and (Q, k) row ids, padded with -1 like FAISS when k > N.
+        """
+        queries = self._normalize(queries)
+
+        ## === All query/document distances in one call ===
+        if simsimd is not None:
+            distances = 2 * np.asarray(simsimd.cdist(queries, self.vectors, metric = "cosine"), dtype = np.float32)
+        else:
+            distances = 2 - 2 * (queries @ self.vectors.T)
+
+        ## === Top-k per row: partial partition, then sort only the k winners ===
+        top = min(k, self.ntotal)
+        labels = np.argpartition(distances, top - 1, axis = 1)[:, :top]
+        top_distances = np.take_along_axis(distances, labels, axis = 1)
+        order = np.argsort(top_distances, axis = 1)
+        labels = np.take_along_axis(labels, order, axis = 1)
+        top_distances = np.take_along_axis(top_distances, order, axis = 1)
+
+        if top < k:
+            labels = np.pad(labels, ((0, 0), (0, k - top)), constant_values = -1)
+            top_distances = np.pad(top_distances, ((0, 0), (0, k - top)), constant_values = np.inf)
+
+        return top_distances.astype(np.float32), labels.astype(np.int64)
@@ -1,20 +1,35 @@
 # === Python Modules ===
 import os
+import json
+import asyncio
+import numpy as np
+from typing import AsyncIterator, List
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from langchain_core.utils.json import parse_partial_json
 
 # === LangGraph + Components ===
 from Task3.graph import create_graph
 from Task3.agent_state import AgentState
 from Task3.components.retriever.faiss_retriever import FAISSRetriever
+from Task3.components.retriever.batching_retriever import BatchingRetriever
+from Task3.utils import get_http_async_client
+from Task3.Agents.rewriter import get_rewriter_model
+from Task3.Agents.grader import get_grader_model
+from Task3.Agents.generation import get_answer_model
 
 # === Load Environment ===
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+## === Startup warmup query: its own conversation thread, and a bound on how long startup may wait for it ===
+WARMUP_THREAD_ID = "_warmup"
+WARMUP_TIMEOUT = 10
+
 # === Lifespan Manager ===
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -24,9 +39,11 @@ async def lifespan(app: FastAPI):
     """
     print("🚀 Starting Mini RAG Agent API...")
 
-    # --- Load FAISS Retriever ---
+    # --- Load FAISS Retriever (concurrent queries are coalesced into batched searches) ---
     retriever_obj = FAISSRetriever()
-    retriever = retriever_obj.load_index()
+    retriever_obj.load_index()
+    retriever = BatchingRetriever(db = retriever_obj.db)
+    retriever.start()
 
     # --- Initialize LangGraph ---
     graph = create_graph()
@@ -35,10 +52,40 @@ async def lifespan(app: FastAPI):
     app.state.graph = graph
     app.state.retriever = retriever
 
+    # --- Warm up: page in the index and run one query, so the first request doesn't pay the cold start ---
+    index = retriever_obj.db.index
+    index.search(np.zeros((1, index.d), dtype = np.float32), 1)
+    try:
+        await asyncio.wait_for(
+            graph.ainvoke(
+                {
+                    "user_query": "ping"
+                },
+                config = {
+                    "configurable": {
+                        "retriever": retriever,
+                        "thread_id": WARMUP_THREAD_ID
+                    }
+                }
+            ),
+            timeout = WARMUP_TIMEOUT
+        )
+    except Exception as e:
+        print(f"⚠️ Warmup failed (non-fatal): {e!r}")
+
     print("✅ Graph and Retriever initialized successfully.")
     yield
     print("🛑 Shutting down Mini RAG Agent API...")
 
+    # --- Stop the retriever worker and close the pooled OpenAI connections ---
+    await retriever.stop()
+    await get_http_async_client().aclose()
+
+    # --- Forget the closed client and the models built on it, so a later startup in this process builds new ones ---
+    get_http_async_client.cache_clear()
+    for get_model in (get_rewriter_model, get_grader_model, get_answer_model):
+        get_model.cache_clear()
+
 
 # === FastAPI App ===
 app = FastAPI(
@@ -55,11 +102,24 @@ app.add_middleware(
     allow_headers = ["*"],
 )
 
+## === Maximum number of queries accepted by one batch request ===
+MAX_BATCH_ITEMS = 100
+
+## === Graph nodes that write the final answer ===
+ANSWER_NODES = ("answer_generation", "fallback_agent")
+
 # === Request Model ===
 class QueryRequest(BaseModel):
     unique_id: str
     query: str
 
+# === Batch Request Model ===
+class BatchQueryRequest(BaseModel):
+    items: List[QueryRequest] = Field(
+        min_length = 1,
+        max_length = MAX_BATCH_ITEMS
+    )
+
 # === Root ===
 @app.get("/")
 def root():
@@ -101,4 +161,122 @@ async def ask_query(payload: QueryRequest):
         raise HTTPException(
             status_code = 500,
             detail = str(e)
-        )
\ No newline at end of file
+        )
+
+# === Helper: Server-Sent Event ===
+def _sse(
+        event: str,
+        data: dict
+) -> str:
+    """
+    Formats one Server-Sent Event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# === Streaming Ask Endpoint ===
+@app.post("/generate/stream")
+async def ask_query_stream(payload: QueryRequest):
+    """
+    Executes the LangGraph pipeline like `/generate`, but streams the answer as Server-Sent Events while it is generated.
+
+    Events:
+        - token: {"token": "..."} -> next piece of the answer.
+        - answer: {"answer": "..."} -> the complete answer (also sent when the fallback agent answers).
+        - error: {"error": "..."} -> the pipeline failed after the stream started.
+    """
+    graph = app.state.graph
+    retriever = app.state.retriever
+
+    async def _events() -> AsyncIterator[str]:
+        ## === The answer model streams its JSON output; decode the partial JSON and send only the new text ===
+        raw = ""
+        sent = ""
+
+        try:
+            async for mode, chunk in graph.astream(
+                {
+                    "user_query": payload.query
+                },
+                config = {
+                    "configurable": {
+                        "retriever": retriever,
+                        "thread_id": payload.unique_id
+                    }
+                },
+                stream_mode = ["messages", "updates"]
+            ):
+                if mode == "messages":
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") != "answer_generation" or not isinstance(message.content, str):
+                        continue
+
+                    raw += message.content
+                    partial = parse_partial_json(raw) if raw else None
+                    answer = partial.get("answer") if isinstance(partial, dict) else None
+                    if isinstance(answer, str) and len(answer) > len(sent):
+                        yield _sse("token", {"token": answer[len(sent):]})
+                        sent = answer
+
+                else:
+                    for node, update in chunk.items():
+                        if node in ANSWER_NODES:
+                            yield _sse("answer", {"answer": update.get("generated_answer")})
+
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        _events(),
+        media_type = "text/event-stream",
+        headers = {
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+# === Batch Ask Endpoint ===
+@app.post("/generate/batch")
+async def ask_queries(payload: BatchQueryRequest):
+    """
+    Executes the LangGraph pipeline for several (UUID, query) pairs concurrently.
+    Returns one entry per item, in request order, with either its answer or its error.
+    """
+    # === Each conversation thread can only run once per batch (its checkpoint is updated in place) ===
+    unique_ids = [item.unique_id for item in payload.items]
+    if len(set(unique_ids)) != len(unique_ids):
+        raise HTTPException(
+            status_code = 422,
+            detail = "Each unique_id may appear only once per batch."
+        )
+
+    graph = app.state.graph
+    retriever = app.state.retriever
+
+    # === Run LangGraph for every item concurrently ===
+    results = await asyncio.gather(
+        *(
+            graph.ainvoke(
+                {
+                    "user_query": item.query
+                },
+                config = {
+                    "configurable": {
+                        "retriever": retriever,
+                        "thread_id": item.unique_id
+                    }
+                }
+            )
+            for item in payload.items
+        ),
+        return_exceptions = True
+    )
+
+    # === Extract the answers, keeping per-item errors ===
+    answers = []
+    for item, result in zip(payload.items, results):
+        if isinstance(result, Exception):
+            answers.append({"unique_id": item.unique_id, "error": str(result)})
+        else:
+            answers.append({"unique_id": item.unique_id, "answer": result.get("generated_answer", "No answer generated.")})
+
+    return {"answers": answers}
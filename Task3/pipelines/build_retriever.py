@@ -8,6 +8,25 @@ from Task3.components.retriever.faiss_retriever import (
 # === Task2 Main Function ===
 from Task2.main import main
 
+## === Text stored in the vector database for each patient, parsed once at import ===
+PATIENT_TEXT = (
+    "Name of the patient is {0}. "
+    "The Patient's diagnosed detail is {1} "
+    "and the suggested treatment is {2} "
+    "and the followup is {3}"
+).format
+
+# === Errors raised by the pipeline, so callers can tell a failed build from a failed load ===
+class RetrieverBuildError(RuntimeError):
+    """
+    Raised when the summaries can't be converted or the vector database can't be built.
+    """
+
+class RetrieverLoadError(RuntimeError):
+    """
+    Raised when a previously built vector database can't be loaded.
+    """
+
 # === Main Pipeline Body for creating or loading the retriever ===
 class CreateRetrieverPipeline:
     def __init__(
@@ -28,32 +47,56 @@ class CreateRetrieverPipeline:
             ## === Data Dict ===
             self.data_dict = main()
 
-            ## === Data ===
-            data = {}
-            for k, v in self.data_dict.items():
-                txt = "Name of the patient is " + v.get("patient", "Not given") + ". The Patient's diagnosed detail is " + v.get("diagnosis", "Not given") + " and the suggested treatment is " + v.get("treatment", "Not Given") + " and the followup is " + v.get("follow_up", "Not Given")
-                data[k] = txt
-            self.data = data
+            ## === Data (one bound `str.format` call per record) ===
+            self.data = {
+                k: PATIENT_TEXT(
+                    v.get("patient", "Not given"),
+                    v.get("diagnosis", "Not given"),
+                    v.get("treatment", "Not Given"),
+                    v.get("follow_up", "Not Given")
+                )
+                for k, v in self.data_dict.items()
+            }
 
         except Exception as e:
-            ValueError(f"Error Converting data from json to str: {e}")
+            raise RetrieverBuildError(f"Error Converting data from json to str: {e}") from e
 
     def main_fn(
             self,
             build: bool = False
-    ):
+    ) -> FAISSRetriever:
+        """
+        Builds the vector database from the structured summaries, or loads the saved one.
+
+        Args:
+            - build (bool, optional): Build (and save) a new index instead of loading the existing one. Defaults to False.
+
+        Returns:
+            - FAISSRetriever: Retriever with its FAISS store loaded.
+
+        Raises:
+            - RetrieverBuildError: If the index can't be built.
+            - RetrieverLoadError: If the saved index can't be loaded.
+        """
         if build:
             try:
+                if not hasattr(self, "data"):
+                    self._json_converter()
+
                 retriever_pipeline = FAISSRetriever()
-                retriever_pipeline.create_documents_from_json(
+                documents = retriever_pipeline.create_documents_from_json(
                     data_dict = self.data_dict,
                     data = self.data
                 )
+                retriever_pipeline.build_index(documents)
 
                 return retriever_pipeline
-                
+
+            except RetrieverBuildError:
+                raise
+
             except Exception as e:
-                ValueError(f"Error Creating Vector Database.")
+                raise RetrieverBuildError(f"Error Creating Vector Database: {e}") from e
 
         else:
             try:
@@ -61,6 +104,6 @@ class CreateRetrieverPipeline:
                 retriever_pipeline.load_index()
 
                 return retriever_pipeline
-            
+
             except Exception as e:
-                ValueError(f"Error Loading the Database.")
\ No newline at end of file
+                raise RetrieverLoadError(f"Error Loading the Database: {e}") from e
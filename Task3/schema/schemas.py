@@ -1,6 +1,6 @@
 # === Python Modules ===
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal
 
 # === Query Rewriter Schema ===
 class QueryRewrite(BaseModel):
@@ -20,8 +20,8 @@ class DocGrader(BaseModel):
     """
     Schema for the output of the document grader agent.
     """
-    score: Literal["Yes", "No"] = Field(
-        description = "Document is relevant to the question? If yes -> 'Yes' if not -> 'No'"
+    scores: List[Literal["Yes", "No"]] = Field(
+        description = "One score per document, in document order. Document is relevant to the question? If yes -> 'Yes' if not -> 'No'"
     )
 
 # === Answer Generation ===
@@ -1,32 +1,65 @@
 # === Python Modules ===
-from typing import Dict, List
+import httpx
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict
+
+# === Shared async HTTP client for every OpenAI call made by the agents ===
+@lru_cache(maxsize = None)
+def get_http_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide pooled `httpx.AsyncClient`, so every agent reuses the same keep-alive connections
+    to the OpenAI API instead of each model opening its own. Closed by the FastAPI lifespan on shutdown.
+    """
+    return httpx.AsyncClient(
+        limits = httpx.Limits(
+            max_connections = 100,
+            max_keepalive_connections = 50
+        ),
+        timeout = 60
+    )
 
 # === Utility to manage conversation history ===
 def update_recent_chats(
-        recent_chats: Dict[int, Dict[str, str]],
+        recent_chats: Deque[Dict[str, str]] | Dict[int, Dict[str, str]] | None,
         latest_question: str,
         answer: str,
         max_chats: int = 3
-) -> Dict[int, Dict[str, str]]:
+) -> Deque[Dict[str, str]]:
     """
-    Updates the conversation history to always contain the last `max_chats` turns.
-    Automatically shifts and reindexes so keys remain sequential (1..max_chats).
+    Appends the latest turn to the conversation history, which always holds the last `max_chats` turns.
+    The history is a bounded deque, so the append is O(1) and the oldest turn drops out on its own.
+    The question and answer are stored as given; the nodes that produce them trim them.
     """
-    # Ensure dictionary is valid
-    if not isinstance(recent_chats, Dict):
-        recent_chats = {}
+    # The checkpointer doesn't keep `maxlen`, and older threads stored a {1: chat, 2: chat} dict
+    if not isinstance(recent_chats, deque) or recent_chats.maxlen != max_chats:
+        if isinstance(recent_chats, dict):
+            recent_chats = recent_chats.values()
+        recent_chats = deque(recent_chats or (), maxlen = max_chats)
 
-    # Append the new chat at the end
-    chats = list(recent_chats.values())
-    chats.append({
-        "question": latest_question.strip(),
-        "answer": answer.strip()
+    recent_chats.append({
+        "question": latest_question,
+        "answer": answer
     })
 
-    # Keep only the last N
-    chats = chats[-max_chats:]
+    return recent_chats
+
+# === Utility to render the conversation history for a prompt ===
+def format_recent_chats(
+        recent_chats: Deque[Dict[str, str]] | Dict[int, Dict[str, str]] | None,
+        max_chats: int = 3
+) -> str:
+    """
+    Renders the last `max_chats` turns as "Q: ...\nA: ..." lines, so the prompt stays a constant size
+    and avoids the noise of a `str(dict)` dump.
+    """
+    if not recent_chats:
+        return "None"
 
-    # Rebuild with proper numeric keys (1..max_chats)
-    recent_chats = {i + 1: chat for i, chat in enumerate(chats)}
+    if isinstance(recent_chats, dict):
+        recent_chats = recent_chats.values()
 
-    return recent_chats
\ No newline at end of file
+    chats = list(recent_chats)[-max_chats:]
+    return "\n".join(
+        f"Q: {chat.get('question', '')}\nA: {chat.get('answer', '')}" for chat in chats
+    )